@@ -30,8 +30,6 @@ class PythonModule(reactContext: ReactApplicationContext) :
         pythonInstance.getModule("index")  // Replace "index" with the name of your Python module
     }
 
-    private val functionCache = mutableMapOf<String, com.chaquo.python.PyObject>()
-
     // This is where you call the warmup function when the class is instantiated
     init {
         warmup()
@@ -63,15 +61,21 @@ class PythonModule(reactContext: ReactApplicationContext) :
     @ReactMethod fun getMoodCategories(promise: Promise) = callPythonFunction("get_mood_categories", promise)
     @ReactMethod fun getMoodPlaylists(params: String, promise: Promise) = callPythonFunction("get_mood_playlists", promise, params)
     @ReactMethod fun getCharts(country: String, promise: Promise) = callPythonFunction("get_charts", promise, country)
+    @ReactMethod fun getFeed(name: String, arg: String?, since: String?, promise: Promise) = callPythonFunction("get_feed", promise, name, arg, since)
     @ReactMethod fun searchMusic(query: String, promise: Promise) = callPythonFunction("search_music", promise, query)
+    @ReactMethod fun searchLocal(query: String, limit: Int, promise: Promise) = callPythonFunction("search_local", promise, query, limit)
+    @ReactMethod fun setOffline(offline: Boolean, promise: Promise) = callPythonFunction("set_offline", promise, offline)
+    @ReactMethod fun searchMusicStream(query: String, promise: Promise) = callPythonFunction("search_music_stream", promise, SearchChunkEmitter(), query)
     @ReactMethod fun getAccountInfo(promise: Promise) = callPythonFunction("get_account_info", promise)
     @ReactMethod fun getArtist(artistId: String, promise: Promise) = callPythonFunction("get_artist", promise, artistId)
     @ReactMethod fun getSong(songId: String, promise: Promise) = callPythonFunction("get_song", promise, songId)
     @ReactMethod fun getAlbum(albumId: String, promise: Promise) = callPythonFunction("get_album", promise, albumId)
+    @ReactMethod fun getEntity(entityId: String, promise: Promise) = callPythonFunction("get_entity", promise, entityId)
     @ReactMethod fun getPlaylist(playlistId: String, promise: Promise) = callPythonFunction("get_playlist", promise, playlistId)
     @ReactMethod fun getWatchPlaylist(videoId: String, promise: Promise) = callPythonFunction("get_watch_playlist", promise, videoId)
     @ReactMethod fun getSearchSuggestions(query: String, detailed: Boolean, promise: Promise) = callPythonFunction("get_search_suggestions", promise, query, detailed)
     @ReactMethod fun streamMusic(videoId: String, promise: Promise) = callPythonFunction("stream_music", promise, videoId)
+    @ReactMethod fun prefetchQueue(videoIds: ReadableArray, depth: Int, promise: Promise) = callPythonFunction("prefetch_queue", promise, videoIds.toArrayList(), depth)
     @ReactMethod fun addHistory(videoId: String, promise: Promise) = callPythonFunction("add_history", promise, videoId)
     @ReactMethod fun getSongInfo(videoId: String, promise: Promise) = callPythonFunction("get_song_details", promise, videoId)
     @ReactMethod fun loadCookie(promise: Promise) = callPythonFunction("load_browser_data", promise)
@@ -88,6 +92,7 @@ class PythonModule(reactContext: ReactApplicationContext) :
     @ReactMethod fun getBrowse(browseId:String,promise: Promise) = callPythonFunction("get_browse", promise,browseId)
     @ReactMethod fun rateSong(videoId: String, rating: String, promise: Promise) = callPythonFunction("rate_song", promise, videoId, rating)
     @ReactMethod fun getLyrics(lyric_id:String?,timestamp:Boolean, promise: Promise) = callPythonFunction("get_lyrics", promise, lyric_id,timestamp)
+    @ReactMethod fun getVideoLyrics(videoId: String, timestamp: Boolean, promise: Promise) = callPythonFunction("get_video_lyrics", promise, videoId, timestamp)
     @ReactMethod fun createPlaylist(
         title: String,
         description: String,
@@ -128,7 +133,62 @@ class PythonModule(reactContext: ReactApplicationContext) :
         promise: Promise
     ) = callPythonFunction("remove_playlist_items", promise, playlistId, video,setVideoId)
     
+    @ReactMethod fun setResponseEncoding(backend: String?, compact: Boolean, compressThreshold: Int, promise: Promise) = callPythonFunction("set_response_encoding", promise, backend, compact, compressThreshold)
+    @ReactMethod fun getStartupProfile(promise: Promise) = callPythonFunction("get_startup_profile", promise)
+    @ReactMethod fun getMetrics(reset: Boolean, promise: Promise) = callPythonFunction("get_metrics", promise, reset)
+    @ReactMethod fun setTracing(enabled: Boolean, promise: Promise) = callPythonFunction("set_tracing", promise, enabled)
+    @ReactMethod fun cancelBackgroundWork(promise: Promise) = callPythonFunction("cancel_background_work", promise)
+    @ReactMethod fun batchGetSongs(songIds: ReadableArray, promise: Promise) = callPythonFunction("batch_get_songs", promise, songIds.toArrayList())
+    @ReactMethod fun batchAddToPlaylist(playlistId: String, videoIds: ReadableArray, promise: Promise) = callPythonFunction("batch_add_to_playlist", promise, playlistId, videoIds.toArrayList())
+
+
+    // Receives results from the Python request engine (index.submit_call)
+    inner class PythonCallback(
+        private val functionName: String,
+        private val promise: Promise,
+        private val startTime: Long
+    ) {
+        fun resolve(result: String?) {
+            val duration = System.currentTimeMillis() - startTime
+            promise.resolve(decodeResponse(result))
+            sendLogToJS(functionName, duration)
+        }
+
+        fun reject(message: String?) {
+            Log.e("ReactNativeJS", "Error in $functionName: $message")
+            promise.reject("PYTHON_ERROR", message)
+        }
+    }
 
+    // Forwards incremental search chunks from index.search_music_stream to JS
+    inner class SearchChunkEmitter {
+        fun chunk(payload: String) {
+            reactApplicationContext
+                .getJSModule(DeviceEventManagerModule.RCTDeviceEventEmitter::class.java)
+                .emit("SearchChunk", decodeResponse(payload))
+        }
+    }
+
+    // Large responses may arrive as "zlib:" + base64 (see RESPONSE_ENCODING in index.py)
+    private fun decodeResponse(result: String?): String? {
+        if (result == null || !result.startsWith("zlib:")) return result
+        val compressed = android.util.Base64.decode(result.substring(5), android.util.Base64.DEFAULT)
+        val inflater = java.util.zip.Inflater()
+        inflater.setInput(compressed)
+        val output = java.io.ByteArrayOutputStream(compressed.size * 4)
+        val buffer = ByteArray(16 * 1024)
+        while (!inflater.finished()) {
+            val count = inflater.inflate(buffer)
+            if (count == 0 && inflater.needsInput()) break
+            output.write(buffer, 0, count)
+        }
+        inflater.end()
+        return output.toString("UTF-8")
+    }
+
+    private val submitCall: com.chaquo.python.PyObject by lazy {
+        pyModule.get("submit_call") ?: throw IllegalStateException("submit_call not found in Python module")
+    }
 
     private fun callPythonFunction(functionName: String, promise: Promise, vararg args: Any?) {
         launch {
@@ -137,23 +197,13 @@ class PythonModule(reactContext: ReactApplicationContext) :
     
                 val startTime = System.currentTimeMillis()
     
-                val function = functionCache.getOrPut(functionName) {
-                    pyModule.get(functionName) ?: throw IllegalStateException("Function $functionName not found in Python module")
-                }
-    
                 // Convert null to Python None
                 val pythonArgs = args.map {
                     it ?: pythonInstance.getBuiltins().get("None")
                 }.toTypedArray()
     
-                val result = function.call(*pythonArgs).toJava(String::class.java)
-    
-                val duration = System.currentTimeMillis() - startTime
-    
-                withContext(Dispatchers.Main) {
-                    promise.resolve(result)
-                    sendLogToJS(functionName, duration)
-                }
+                // Returns as soon as the call is queued; the callback settles the promise
+                submitCall.call(PythonCallback(functionName, promise, startTime), functionName, *pythonArgs)
             } catch (e: Exception) {
                 Log.e("ReactNativeJS", "Error in $functionName", e)
                 withContext(Dispatchers.Main) {
@@ -1,10 +1,24 @@
 import os
+import re
 import json
 import time
+import asyncio
+import random
+import sys
+import socket
 import zlib
+import base64
+import hashlib
+import http.cookiejar
+import sqlite3
 import threading
-from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from collections import deque
+from contextlib import contextmanager
+from functools import partial, wraps
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+
+_IMPORT_STARTED_AT = time.perf_counter()
 
 # ─────────────────────────────────────────────
 # 🔧 Configuration
@@ -16,13 +30,177 @@ BROWSER_JSON = os.path.join(STORAGE_PATH, "browser.json")
 COOKIE_FILE = os.path.join(STORAGE_PATH, "cookies.txt")
 NETSCAPE_COOKIE_FILE = os.path.join(STORAGE_PATH, "cookies_netscape.txt")
 
-# Thread pool for concurrent operations
-_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+# Workers for blocking network calls (driven by the async request engine)
+_MAX_WORKERS = 8
+
+# Workers for bridge calls submitted through submit_call
+_BRIDGE_WORKERS = 16
 
 # Lazy-loaded modules
 _yt_dlp = None
 _YTMusic = None
 _ytmusic_instance = None
+_ytmusic_auth_version = 0
+
+# ─────────────────────────────────────────────
+# 🚥 Priority Scheduler
+# ─────────────────────────────────────────────
+
+# Highest priority first
+LANES = ("playback", "interactive", "background")
+
+# Lane of each bridge function; anything not listed is "interactive".
+# yt-dlp extraction does not go through the engine: stream_music extracts in
+# its playback-lane bridge thread and prefetches run as background bridge tasks.
+FUNCTION_LANES = {
+    "stream_music": "playback",
+    "get_song": "playback",
+    "get_watch_playlist": "playback",
+    "warmup": "background",
+    "load_browser_data": "background",
+    "add_history": "background",
+    "prefetch_queue": "background",
+    "batch_get_songs": "background",
+    "batch_add_to_playlist": "background",
+}
+
+STARVATION_AGE = 10  # Seconds a background task may wait before it is promoted
+
+_LANE_LOCAL = threading.local()
+
+def current_lane():
+    return getattr(_LANE_LOCAL, "lane", "interactive")
+
+@contextmanager
+def in_lane(lane):
+    """Run the block (and the upstream calls it makes) in the given lane"""
+    previous = getattr(_LANE_LOCAL, "lane", None)
+    _LANE_LOCAL.lane = lane
+    try:
+        yield
+    finally:
+        _LANE_LOCAL.lane = previous
+
+def run_in_lane(lane, func, *args, **kwargs):
+    with in_lane(lane):
+        return func(*args, **kwargs)
+
+class PriorityScheduler(Executor):
+    """
+    Thread pool with one queue per lane. Idle workers take the oldest task
+    from the highest-priority lane; `reserved` workers only ever run playback,
+    at most `background_limit` background tasks run at once, and background
+    tasks queued longer than STARVATION_AGE are promoted to interactive.
+    Queued tasks can be cancelled through their future.
+    """
+
+    def __init__(self, name, workers, reserved, background_limit):
+        self.name = name
+        self.workers = workers
+        self.reserved = reserved
+        self.background_limit = background_limit
+        self._cond = threading.Condition()
+        self._queues = {lane: deque() for lane in LANES}
+        self._running = dict.fromkeys(LANES, 0)
+        self._threads = []
+        self.stats = {
+            lane: {"submitted": 0, "completed": 0, "cancelled": 0, "promoted": 0, "max_wait_ms": 0.0}
+            for lane in LANES
+        }
+
+    def submit(self, fn, *args, **kwargs):
+        """Executor interface: queue in the caller's current lane"""
+        return self.submit_to(current_lane(), fn, *args, **kwargs)
+
+    def submit_to(self, lane, fn, *args, **kwargs):
+        future = Future()
+        with self._cond:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._queues[lane].append((time.perf_counter(), lane, future, fn, args, kwargs))
+            self.stats[lane]["submitted"] += 1
+            self._cond.notify()
+        return future
+
+    def cancel(self, lane="background"):
+        """Cancel every task still queued in lane; returns how many were cancelled"""
+        with self._cond:
+            queued, self._queues[lane] = self._queues[lane], deque()
+        cancelled = sum(task[2].cancel() for task in queued)
+        self.stats[lane]["cancelled"] += cancelled
+        return cancelled
+
+    def _promote_starved(self):
+        background = self._queues["background"]
+        now = time.perf_counter()
+        while background and now - background[0][0] > STARVATION_AGE:
+            self._queues["interactive"].append(background.popleft())
+            self.stats["background"]["promoted"] += 1
+
+    def _next_task(self):
+        # Called with the lock held
+        self._promote_starved()
+        busy = sum(self._running.values())
+        for lane in LANES:
+            if lane != "playback" and busy >= self.workers - self.reserved:
+                continue
+            if lane == "background" and self._running["background"] >= self.background_limit:
+                continue
+            if self._queues[lane]:
+                return lane, self._queues[lane].popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                picked = self._next_task()
+                while picked is None:
+                    self._cond.wait(1.0)
+                    picked = self._next_task()
+                lane, (queued, origin, future, fn, args, kwargs) = picked
+                self._running[lane] += 1
+
+            wait_ms = (time.perf_counter() - queued) * 1000
+            stats = self.stats[origin]
+            stats["max_wait_ms"] = round(max(stats["max_wait_ms"], wait_ms), 1)
+            record_metric(f"queue:{self.name}.{origin}", wait_ms)
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = run_in_lane(origin, fn, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                stats["completed"] += 1
+            else:
+                stats["cancelled"] += 1
+
+            with self._cond:
+                self._running[lane] -= 1
+                self._cond.notify_all()
+
+    def info(self):
+        with self._cond:
+            return {
+                lane: dict(self.stats[lane], queued=len(self._queues[lane]), running=self._running[lane])
+                for lane in LANES
+            }
+
+_EXECUTOR = PriorityScheduler("engine", _MAX_WORKERS, reserved=2, background_limit=2)
+_BRIDGE_EXECUTOR = PriorityScheduler("bridge", _BRIDGE_WORKERS, reserved=4, background_limit=4)
+
+def get_scheduler_stats():
+    return {"engine": _EXECUTOR.info(), "bridge": _BRIDGE_EXECUTOR.info()}
+
+def cancel_background_work():
+    """Drop queued background tasks and pending prefetches"""
+    cancelled = {"engine": _EXECUTOR.cancel(), "bridge": _BRIDGE_EXECUTOR.cancel()}
+    with _PREFETCH_LOCK:
+        cancelled["prefetch"] = sum(future.cancel() for future in list(_PREFETCH_FUTURES.values()))
+    return json_response({"status": "success", "cancelled": cancelled})
 
 # ─────────────────────────────────────────────
 # 🚀 Optimized yt-dlp Configuration
@@ -56,8 +234,6 @@ YDL_OPTIONS = {
     "load_info_interval": 0,
     "ignore_no_formats_error": True,
     "lazy_extractors": True,
-    "dns": "8.8.8.8",
-    "dns_cache": True,
     "geo_bypass": True,
     "compat_opts": {
         "no-youtube-chapter": True,
@@ -71,7 +247,6 @@ YDL_OPTIONS = {
     "nooverwrites": True,
     "noprogress": True,
     "http_chunk_size": 8192,
-    "cookie":NETSCAPE_COOKIE_FILE
 }
 
 # ─────────────────────────────────────────────
@@ -83,122 +258,1470 @@ def get_ytdl():
     if _yt_dlp is None:
         import yt_dlp as yt
         _yt_dlp = yt
-    return _yt_dlp.YoutubeDL(YDL_OPTIONS)
+    ydl = _yt_dlp.YoutubeDL(YDL_OPTIONS)
+    jar = getattr(ydl, "cookiejar", None)
+    if jar is not None:
+        # Cookies come from the parsed auth state, not from a cookie file
+        for cookie in auth_state()["cookies"]:
+            jar.set_cookie(cookie)
+    return ydl
+
+# Long-lived YoutubeDL instances, one per concurrent extraction
+YDL_POOL_SIZE = min(_MAX_WORKERS, 4)
+
+_YDL_POOL = []
+_YDL_POOL_LOCK = threading.Lock()
+_YDL_POOL_GENERATION = 0
+_YDL_POOL_STATS = {"created": 0, "reused": 0, "discarded": 0}
+
+def _close_ytdl(ydl):
+    close = getattr(ydl, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+@contextmanager
+def pooled_ytdl():
+    """Borrow a YoutubeDL instance from the pool, building one only when none is idle"""
+    with _YDL_POOL_LOCK:
+        generation = _YDL_POOL_GENERATION
+        ydl = _YDL_POOL.pop() if _YDL_POOL else None
+    if ydl is None:
+        ydl = get_ytdl()
+        _YDL_POOL_STATS["created"] += 1
+    else:
+        _YDL_POOL_STATS["reused"] += 1
+
+    try:
+        yield ydl
+    finally:
+        with _YDL_POOL_LOCK:
+            keep = generation == _YDL_POOL_GENERATION and len(_YDL_POOL) < YDL_POOL_SIZE
+            if keep:
+                _YDL_POOL.append(ydl)
+        if not keep:
+            _YDL_POOL_STATS["discarded"] += 1
+            _close_ytdl(ydl)
+
+def invalidate_ytdl_pool():
+    """Drop idle pooled instances; borrowed ones are discarded when returned"""
+    global _YDL_POOL_GENERATION
+    with _YDL_POOL_LOCK:
+        _YDL_POOL_GENERATION += 1
+        idle = _YDL_POOL[:]
+        _YDL_POOL.clear()
+    for ydl in idle:
+        _close_ytdl(ydl)
 
 def get_ytmusic():
-    global _YTMusic, _ytmusic_instance
-    if _ytmusic_instance is None:
+    global _YTMusic, _ytmusic_instance, _ytmusic_auth_version
+    state = auth_state()
+    if _ytmusic_instance is None or _ytmusic_auth_version != state["version"]:
         if _YTMusic is None:
             from ytmusicapi import YTMusic as YTM
             _YTMusic = YTM
         
-        if os.path.exists(BROWSER_JSON):
-            _ytmusic_instance = _YTMusic(BROWSER_JSON)
+        session = get_http_session()
+        if state["headers"]:
+            _ytmusic_instance = _YTMusic(state["headers"], requests_session=session)
         else:
-            _ytmusic_instance = _YTMusic()
+            _ytmusic_instance = _YTMusic(requests_session=session)
+        _ytmusic_auth_version = state["version"]
     return _ytmusic_instance
 
-def convert_cookies_to_netscape(input_file=COOKIE_FILE, output_file=NETSCAPE_COOKIE_FILE):
-    if not os.path.exists(input_file):
-        return False
+# ─────────────────────────────────────────────
+# 🌐 Shared HTTP Connections
+# ─────────────────────────────────────────────
 
-    with open(input_file, "r") as f:
-        lines = f.read().splitlines()
+# Tunable through update_connection_options
+HTTP_OPTIONS = {
+    "pool_connections": 4,  # Hosts kept in the pool
+    "pool_maxsize": 8,      # Keep-alive connections per host
+    "timeout": 10,          # Seconds per request on the shared session
+    "dns_ttl": 300,         # Seconds a resolved address is reused; 0 disables the cache
+}
 
-    netscape_cookies = ["# Netscape HTTP Cookie File\n"]
-    for line in lines:
-        if "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        netscape_cookies.append(f".music.youtube.com\tTRUE\t/\tTRUE\t2147483647\t{key}\t{value}\n")
+DNS_CACHE_MAX_ENTRIES = 32  # The app talks to a handful of hosts
+
+_http_session = None
+_HTTP_LOCK = threading.Lock()
+_DNS_LOCK = threading.Lock()
+_DNS_CACHE = {}
+_DNS_STATS = {"hits": 0, "misses": 0}
+_original_getaddrinfo = None
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    ttl = HTTP_OPTIONS["dns_ttl"]
+    if not ttl:
+        return _original_getaddrinfo(host, port, *args, **kwargs)
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    cached = _DNS_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        _DNS_STATS["hits"] += 1
+        return cached[1]
+    _DNS_STATS["misses"] += 1
+    result = _original_getaddrinfo(host, port, *args, **kwargs)
+    with _DNS_LOCK:
+        if len(_DNS_CACHE) >= DNS_CACHE_MAX_ENTRIES and key not in _DNS_CACHE:
+            del _DNS_CACHE[min(_DNS_CACHE, key=lambda k: _DNS_CACHE[k][0])]
+        _DNS_CACHE[key] = (time.monotonic(), result)
+    return result
+
+def _install_resolver():
+    """
+    Cache getaddrinfo process-wide, so yt-dlp's own handlers share the
+    resolved addresses too. Installed with the first HTTP session rather
+    than at import.
+    """
+    global _original_getaddrinfo
+    if _original_getaddrinfo is None:
+        _original_getaddrinfo = socket.getaddrinfo
+        socket.getaddrinfo = _cached_getaddrinfo
+
+def clear_dns_cache():
+    with _DNS_LOCK:
+        _DNS_CACHE.clear()
+
+def get_http_session():
+    """Keep-alive requests session shared by every YTMusic instance"""
+    global _http_session
+    with _HTTP_LOCK:
+        if _http_session is None:
+            _install_resolver()
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_OPTIONS["pool_connections"],
+                pool_maxsize=HTTP_OPTIONS["pool_maxsize"],
+                max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # ytmusicapi only applies its default timeout to sessions it creates itself
+            session.request = partial(session.request, timeout=HTTP_OPTIONS["timeout"])
+            _http_session = session
+        return _http_session
+
+def close_http_session():
+    global _http_session
+    with _HTTP_LOCK:
+        session, _http_session = _http_session, None
+    if session is not None:
+        session.close()
+    clear_dns_cache()
+
+def get_connection_stats():
+    """Requests vs. new connections on the shared session; the difference is keep-alive reuse"""
+    requests_sent = connections = 0
+    session = _http_session
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = getattr(adapter, "poolmanager", None)
+            for key in list(pools.pools.keys()) if pools else []:
+                pool = pools.pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+    return {
+        "requests": requests_sent,
+        "connections_opened": connections,
+        "connections_reused": max(requests_sent - connections, 0),
+        "dns": dict(_DNS_STATS, entries=len(_DNS_CACHE)),
+        "ytdl_instances_reused": _YDL_POOL_STATS["reused"],
+    }
 
-    with open(output_file, "w") as f:
-        f.write("".join(netscape_cookies))
-    return True
+def update_connection_options(new_options):
+    """Retune the shared connection pool; the next call builds a fresh session"""
+    global _ytmusic_instance
+    unknown = [opt for opt in new_options if opt not in HTTP_OPTIONS]
+    if unknown:
+        return json_response({"error": f"Unknown connection options: {', '.join(unknown)}"})
+    HTTP_OPTIONS.update(new_options)
+    close_http_session()
+    _ytmusic_instance = None
+    return json_response({"status": "success", "options": HTTP_OPTIONS})
+
+# ─────────────────────────────────────────────
+# 🔐 Auth State
+# ─────────────────────────────────────────────
+
+AUTH_CHECK_INTERVAL = 5  # Seconds between stat() checks of browser.json
+
+_AUTH_LOCK = threading.Lock()
+_AUTH_STATE = {
+    "stamp": None,       # (mtime_ns, size) of browser.json when last read
+    "digest": None,      # sha1 of its contents
+    "headers": None,     # Parsed browser.json, handed to YTMusic as-is
+    "cookies": [],       # http.cookiejar.Cookie objects for yt-dlp
+    "version": 0,        # Bumped whenever the auth data actually changes
+    "checked_at": 0.0,
+}
+_AUTH_STATS = {"checks": 0, "reloads": 0, "file_writes": 0}
+
+def _parse_cookie_header(header):
+    pairs = []
+    for part in header.split(";"):
+        name, sep, value = part.strip().partition("=")
+        if sep and name:
+            pairs.append((name, value))
+    return pairs
+
+def _make_cookie(name, value):
+    return http.cookiejar.Cookie(
+        0, name, value, None, False, ".youtube.com", True, True, "/", True,
+        True, 2147483647, False, None, None, {}
+    )
+
+def _write_cookie_files(pairs):
+    """Keep cookies.txt and its Netscape copy for external tools; written only on change"""
+    with open(COOKIE_FILE, "w") as f:
+        f.write("\n".join(f"{name}={value}" for name, value in pairs))
+    with open(NETSCAPE_COOKIE_FILE, "w") as f:
+        f.write("# Netscape HTTP Cookie File\n")
+        f.writelines(f".youtube.com\tTRUE\t/\tTRUE\t2147483647\t{name}\t{value}\n" for name, value in pairs)
+    _AUTH_STATS["file_writes"] += 1
+
+def auth_state(force=False):
+    """
+    Parsed auth data shared by YTMusic and yt-dlp. browser.json is stat()ed at
+    most every AUTH_CHECK_INTERVAL seconds and only reparsed when it changed.
+    """
+    now = time.time()
+    if not force and now - _AUTH_STATE["checked_at"] < AUTH_CHECK_INTERVAL:
+        return _AUTH_STATE
+    _AUTH_STATS["checks"] += 1
+    try:
+        stat = os.stat(BROWSER_JSON)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+
+    with _AUTH_LOCK:
+        _AUTH_STATE["checked_at"] = now
+        if stamp == _AUTH_STATE["stamp"]:
+            return _AUTH_STATE
+        _AUTH_STATE["stamp"] = stamp
+
+        headers, digest = None, None
+        if stamp is not None:
+            try:
+                with open(BROWSER_JSON, "rb") as f:
+                    raw = f.read()
+                digest = hashlib.sha1(raw).hexdigest()
+                headers = json.loads(raw)
+            except (OSError, ValueError):
+                headers = None
+        if digest == _AUTH_STATE["digest"]:
+            return _AUTH_STATE  # Touched but unchanged
+
+        pairs = _parse_cookie_header(headers.get("Cookie", "")) if isinstance(headers, dict) else []
+        if pairs:
+            try:
+                _write_cookie_files(pairs)
+            except OSError:
+                pass
+        _AUTH_STATE.update(
+            digest=digest,
+            headers=headers if isinstance(headers, dict) else None,
+            cookies=[_make_cookie(name, value) for name, value in pairs],
+            version=_AUTH_STATE["version"] + 1
+        )
+        _AUTH_STATS["reloads"] += 1
+
+    # New credentials: pooled yt-dlp instances still hold the old cookies
+    invalidate_ytdl_pool()
+    return _AUTH_STATE
 
 def load_browser_data():
-    if not os.path.exists(BROWSER_JSON):
-        return None
-        
-    with open(BROWSER_JSON, 'rb') as f:
-        data = json.load(f)
-    
-    if "Cookie" not in data:
-        return None
-        
-    with open(COOKIE_FILE, 'w') as f:
-        f.write(data["Cookie"].replace("; ", "\n"))
-    
-    return convert_cookies_to_netscape()
+    """Re-check browser.json now; True when it holds cookies"""
+    return True if auth_state(force=True)["cookies"] else None
+
+def get_auth_stats():
+    return dict(
+        _AUTH_STATS,
+        version=_AUTH_STATE["version"],
+        authenticated=bool(_AUTH_STATE["headers"]),
+        cookies=len(_AUTH_STATE["cookies"])
+    )
+
+# ─────────────────────────────────────────────
+# 🚦 Staged Startup
+# ─────────────────────────────────────────────
+
+WARMUP_NETWORK = True  # Prime DNS/TLS with one small request instead of a full extraction
+
+_STARTUP_PROFILE = {"module_import_ms": None, "stages": {}, "warmup_ms": None, "first_stream_ms": None}
+_background_services_started = False
+
+def _import_clients():
+    global _yt_dlp, _YTMusic
+    if _yt_dlp is None:
+        import yt_dlp as yt
+        _yt_dlp = yt
+    if _YTMusic is None:
+        from ytmusicapi import YTMusic as YTM
+        _YTMusic = YTM
+
+def _prime_extractor():
+    # Instantiates the YouTube extractor on a pooled instance; no network request
+    with pooled_ytdl() as ydl:
+        ydl.get_info_extractor("Youtube")
+
+def _prime_network():
+    if WARMUP_NETWORK:
+        get_ytmusic().get_search_suggestions("a")
+
+WARMUP_STAGES = (
+    ("imports", _import_clients),
+    ("cookies", load_browser_data),
+    ("client", get_ytmusic),
+    ("extractor", _prime_extractor),
+    ("network", _prime_network),
+)
+
+def _run_stage(name, func):
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        func()
+    except Exception as e:
+        status = f"{e.__class__.__name__}: {e}"
+    _STARTUP_PROFILE["stages"][name] = {
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+        "status": status
+    }
+
+def start_background_services():
+    """Start maintenance threads; deferred from import to warmup"""
+    global _background_services_started
+    if not _background_services_started:
+        _background_services_started = True
+        threading.Thread(target=periodic_cleanup, daemon=True).start()
 
 def warmup():
     """Initialize components in background"""
     def _warmup():
-        try:
-            # Warm up yt-dlp
-            ydl = get_ytdl()
-            ydl.extract_info("https://www.youtube.com/watch?v=MvsAesQ-4zA", download=False)
-            
-            # Warm up YTMusic
-            get_ytmusic().get_home(limit=1)
-        except Exception:
-            pass
+        start = time.perf_counter()
+        for name, func in WARMUP_STAGES:
+            run_in_lane("background", _run_stage, name, func)
+        _STARTUP_PROFILE["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        start_background_services()
 
     threading.Thread(target=_warmup, daemon=True).start()
     return "Warmup initiated"
 
+def get_startup_profile():
+    """Per-stage startup timings; first_stream_ms is measured from module import"""
+    return json_response(_STARTUP_PROFILE)
+
+# ─────────────────────────────────────────────
+# ⚡ Async Request Engine
+# ─────────────────────────────────────────────
+
+API_TIMEOUT = 5
+
+# Per-endpoint overrides of API_TIMEOUT
+ENDPOINT_TIMEOUTS = {
+    "search": 10,
+    "add_playlist_items": 20,
+    "get_library_songs": 30,
+    "get_liked_songs": 30,
+    "get_library_playlists": 30,
+    "get_library_albums": 30,
+}
+
+# Maximum in-flight calls per ytmusicapi endpoint
+ENDPOINT_CONCURRENCY = {
+    "default": 4,
+    "search": 5,
+    "get_search_suggestions": 2,
+    "add_playlist_items": 1,
+    "add_history_item": 1,
+}
+
+_ENGINE_LOOP = None
+_ENGINE_LOCK = threading.Lock()
+_ENDPOINT_SEMAPHORES = {}
+
+def _engine_loop():
+    """Event loop thread that schedules every upstream call"""
+    global _ENGINE_LOOP
+    with _ENGINE_LOCK:
+        if _ENGINE_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="api-engine", daemon=True).start()
+            _ENGINE_LOOP = loop
+    return _ENGINE_LOOP
+
+def _endpoint_semaphore(endpoint):
+    # Only touched from the engine loop thread
+    if endpoint not in _ENDPOINT_SEMAPHORES:
+        limit = ENDPOINT_CONCURRENCY.get(endpoint, ENDPOINT_CONCURRENCY["default"])
+        _ENDPOINT_SEMAPHORES[endpoint] = asyncio.Semaphore(limit)
+    return _ENDPOINT_SEMAPHORES[endpoint]
+
+async def _run_api_call(endpoint, func, args, kwargs, timeout, lane):
+    policy = call_policy(endpoint)
+
+    async def _call():
+        if lane == "playback":
+            # Playback never waits for endpoint slots held by other lanes
+            return await asyncio.wrap_future(_EXECUTOR.submit_to(lane, func, *args, **kwargs))
+        async with _endpoint_semaphore(endpoint):
+            return await asyncio.wrap_future(_EXECUTOR.submit_to(lane, func, *args, **kwargs))
+
+    attempt = 0
+    while True:
+        trial = _check_circuit(endpoint)
+        started = time.monotonic()
+        try:
+            # On timeout the call is cancelled: queued work never starts and its
+            # endpoint slot is released straight away
+            result = await asyncio.wait_for(_call(), timeout)
+        except Exception as e:
+            if not _is_transient(e):
+                _record_success(endpoint)  # Upstream answered; the request itself was bad
+                raise
+            _record_failure(endpoint)
+            if attempt >= policy["retries"]:
+                raise
+            attempt += 1
+            _POLICY_STATS[endpoint]["retries"] += 1
+            await asyncio.sleep(_backoff_delay(policy, attempt))
+            continue
+        finally:
+            if trial:
+                _end_trial(endpoint)
+        _record_success(endpoint, time.monotonic() - started)
+        return result
+
+# Single-flight: identical concurrent calls share one in-flight future
+SINGLE_FLIGHT_SKIP_PREFIXES = ("add_", "remove_", "edit_", "create_", "delete_", "rate_", "subscribe", "unsubscribe")
+
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+_SINGLE_FLIGHT_STATS = {"leaders": 0, "joins": 0}
+
+def _single_flight_key(func, args, kwargs):
+    endpoint = getattr(func, "__name__", "")
+    if not endpoint or endpoint.startswith(SINGLE_FLIGHT_SKIP_PREFIXES):
+        return None  # Never merge mutations
+    key = (endpoint, id(getattr(func, "__self__", func)), args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def _join_or_lead(key, start):
+    """
+    Return (future, is_leader): the in-flight future for key, or the one
+    built by start() if nobody is running this call yet
+    """
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.get(key)
+        if future is not None:
+            _SINGLE_FLIGHT_STATS["joins"] += 1
+            return future, False
+        future = start()
+        _INFLIGHT[key] = future
+        _SINGLE_FLIGHT_STATS["leaders"] += 1
+    future.add_done_callback(lambda f: _forget_inflight(key, f))
+    return future, True
+
+def _forget_inflight(key, future):
+    with _INFLIGHT_LOCK:
+        if _INFLIGHT.get(key) is future:
+            del _INFLIGHT[key]
+
+def submit_api_call(func, *args, **kwargs):
+    """Schedule func on the request engine; returns a concurrent.futures.Future"""
+    endpoint = getattr(func, "__name__", "default")
+    lane = current_lane()
+
+    def start():
+        return asyncio.run_coroutine_threadsafe(
+            _run_api_call(endpoint, func, args, kwargs, ENDPOINT_TIMEOUTS.get(endpoint, API_TIMEOUT), lane),
+            _engine_loop()
+        )
+
+    key = _single_flight_key(func, args, kwargs)
+    if key is not None and lane == "playback":
+        key += ("playback",)  # Never join a call queued in a lower lane
+    return start() if key is None else _join_or_lead(key, start)[0]
+
+def _bridge_call(callback, function_name, args, queued):
+    _SPAN_LOCAL.queue_ms = round((time.perf_counter() - queued) * 1000, 2)
+    try:
+        result = globals()[function_name](*args)
+        if result is not None and not isinstance(result, str):
+            result = json_response(result)  # resolve() only takes String?
+    except Exception as e:
+        callback.reject(f"{e.__class__.__name__}: {e}")
+        return
+    finally:
+        _SPAN_LOCAL.queue_ms = None
+    try:
+        callback.resolve(result)
+    except Exception as e:
+        callback.reject(f"{e.__class__.__name__}: {e}")
+
+def _settle_unfinished(callback, function_name, future):
+    # A cancelled or crashed task must still settle its promise
+    if future.cancelled():
+        message = f"CancelledError: {function_name} was cancelled"
+    elif future.exception() is not None:
+        error = future.exception()
+        message = f"{error.__class__.__name__}: {error}"
+    else:
+        return
+    try:
+        callback.reject(message)
+    except Exception:
+        pass
+
+def submit_call(callback, function_name, *args):
+    """
+    Non-blocking entry point for the Kotlin bridge: runs an exported function
+    and reports through callback.resolve(result) / callback.reject(message)
+    """
+    lane = FUNCTION_LANES.get(function_name, "interactive")
+    future = _BRIDGE_EXECUTOR.submit_to(lane, _bridge_call, callback, function_name, args, time.perf_counter())
+    future.add_done_callback(partial(_settle_unfinished, callback, function_name))
+    return function_name
+
+# ─────────────────────────────────────────────
+# 🛡️ Call Policies (retry, circuit breaker, hedging)
+# ─────────────────────────────────────────────
+
+# Per-endpoint policy; missing fields fall back to "default".
+# Configurable at runtime through update_call_policies.
+CALL_POLICIES = {
+    "default": {
+        "retries": 1,              # Extra attempts after a transient failure
+        "backoff": 0.2,            # Base delay (seconds), doubled per attempt and jittered
+        "breaker_threshold": 5,    # Consecutive transient failures that open the circuit
+        "breaker_cooldown": 30,    # Seconds the circuit stays open before a trial call
+        "hedge": False,            # Fire a second attempt if the first is slower than p90
+        "hedge_min_delay": 1.0,    # Hedge delay used until enough latencies are recorded
+    },
+    "stream_music": {"hedge": True, "breaker_cooldown": 15},
+}
+
+# Mutations are never retried unless a policy says so explicitly
+NO_RETRY_PREFIXES = SINGLE_FLIGHT_SKIP_PREFIXES
+
+_TRANSIENT_ERROR = re.compile(r"HTTP (Error )?(429|5\d\d)|timed out|[Cc]onnection|[Tt]emporary failure")
+# Both attempts of a hedged playback extraction; nothing else runs here
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+_POLICY_LOCK = threading.Lock()
+_CIRCUITS = {}
+_LATENCIES = {}
+_POLICY_STATS = {}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+def call_policy(endpoint):
+    policy = dict(CALL_POLICIES["default"])
+    if endpoint.startswith(NO_RETRY_PREFIXES):
+        policy["retries"] = 0
+    policy.update(CALL_POLICIES.get(endpoint, {}))
+    _POLICY_STATS.setdefault(endpoint, {"retries": 0, "hedges": 0, "hedge_wins": 0, "short_circuited": 0})
+    return policy
+
+def _is_transient(error):
+    if isinstance(error, (asyncio.TimeoutError, FutureTimeoutError, TimeoutError, OSError)):
+        return True
+    return bool(_TRANSIENT_ERROR.search(str(error)))
+
+def _backoff_delay(policy, attempt):
+    return policy["backoff"] * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+def _check_circuit(endpoint):
+    """
+    Fail fast while open; after the cooldown let a single trial call through.
+    Returns True for that trial call, which must end with _end_trial.
+    """
+    with _POLICY_LOCK:
+        circuit = _CIRCUITS.get(endpoint)
+        if circuit is None or circuit["opened_at"] is None:
+            return False
+        if circuit["trial"] or time.monotonic() - circuit["opened_at"] < call_policy(endpoint)["breaker_cooldown"]:
+            _POLICY_STATS[endpoint]["short_circuited"] += 1
+            raise CircuitOpenError(f"{endpoint} is failing; retrying after cooldown")
+        circuit["trial"] = True
+        return True
+
+def _end_trial(endpoint):
+    # Whatever way the trial call ended, the next one may try again
+    with _POLICY_LOCK:
+        circuit = _CIRCUITS.get(endpoint)
+        if circuit is not None:
+            circuit["trial"] = False
+
+def _record_failure(endpoint):
+    with _POLICY_LOCK:
+        circuit = _CIRCUITS.setdefault(endpoint, {"failures": 0, "opened_at": None, "trial": False})
+        circuit["failures"] += 1
+        if circuit["trial"] or circuit["failures"] >= call_policy(endpoint)["breaker_threshold"]:
+            circuit["opened_at"] = time.monotonic()
+        circuit["trial"] = False
+
+def _record_success(endpoint, latency=None):
+    with _POLICY_LOCK:
+        _CIRCUITS[endpoint] = {"failures": 0, "opened_at": None, "trial": False}
+        if latency is not None:
+            _LATENCIES.setdefault(endpoint, deque(maxlen=100)).append(latency)
+
+def latency_percentile(endpoint, percentile):
+    """Recent latency (seconds) at percentile, or None with fewer than 10 samples"""
+    samples = sorted(_LATENCIES.get(endpoint, ()))
+    if len(samples) < 10:
+        return None
+    return samples[min(int(len(samples) * percentile), len(samples) - 1)]
+
+def call_with_policy(endpoint, func, *args):
+    """
+    Blocking counterpart of the engine's policy handling, for work that does
+    not go through ytmusicapi (yt-dlp extraction). Runs func in the calling
+    thread; only playback-lane calls are hedged.
+    """
+    policy = call_policy(endpoint)
+    hedge = policy["hedge"] and current_lane() == "playback"
+    attempt = 0
+    while True:
+        trial = _check_circuit(endpoint)
+        started = time.monotonic()
+        try:
+            result = _hedged(endpoint, policy, func, args) if hedge else func(*args)
+        except Exception as e:
+            if not _is_transient(e):
+                _record_success(endpoint)  # Upstream answered; the request itself was bad
+                raise
+            _record_failure(endpoint)
+            if attempt >= policy["retries"]:
+                raise
+            attempt += 1
+            _POLICY_STATS[endpoint]["retries"] += 1
+            time.sleep(_backoff_delay(policy, attempt))
+            continue
+        finally:
+            if trial:
+                _end_trial(endpoint)
+        _record_success(endpoint, time.monotonic() - started)
+        return result
+
+def _hedged(endpoint, policy, func, args):
+    """
+    Run func on _HEDGE_EXECUTOR. If it is still running the recent p90 latency
+    after it started, a second attempt races it and the first success wins;
+    the error is raised only when both attempts fail.
+    """
+    delay = latency_percentile(endpoint, 0.9) or policy["hedge_min_delay"]
+    lane = current_lane()
+    started = threading.Event()
+
+    def first_attempt():
+        started.set()
+        return run_in_lane(lane, func, *args)
+
+    first = _HEDGE_EXECUTOR.submit(first_attempt)
+    started.wait()  # The hedge delay counts from the start, not from submission
+    if wait([first], timeout=delay).done:
+        return first.result()
+
+    _POLICY_STATS[endpoint]["hedges"] += 1
+    pending = {first, _HEDGE_EXECUTOR.submit(run_in_lane, lane, func, *args)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not first:
+                    _POLICY_STATS[endpoint]["hedge_wins"] += 1
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+def get_policy_stats():
+    stats = {}
+    for endpoint, counters in list(_POLICY_STATS.items()):
+        circuit = _CIRCUITS.get(endpoint) or {}
+        p90 = latency_percentile(endpoint, 0.9)
+        stats[endpoint] = dict(
+            counters,
+            circuit="open" if circuit.get("opened_at") is not None else "closed",
+            consecutive_failures=circuit.get("failures", 0),
+            p90_ms=round(p90 * 1000, 1) if p90 is not None else None
+        )
+    return stats
+
+def update_call_policies(new_policies):
+    """
+    Merge per-endpoint policy overrides, e.g.
+    {"stream_music": {"retries": 2}, "default": {"breaker_threshold": 3}}
+    """
+    allowed = set(CALL_POLICIES["default"])
+    for endpoint, overrides in new_policies.items():
+        unknown = set(overrides) - allowed
+        if unknown:
+            return json_response({"error": f"Unknown policy options for {endpoint}: {', '.join(sorted(unknown))}"})
+    for endpoint, overrides in new_policies.items():
+        CALL_POLICIES.setdefault(endpoint, {}).update(overrides)
+    return json_response({"status": "success", "policies": CALL_POLICIES})
+
+# ─────────────────────────────────────────────
+# 📈 Metrics & Tracing
+# ─────────────────────────────────────────────
+
+# Histogram bucket upper bounds in ms (~30% apart, 1ms to ~100s)
+METRICS_BUCKETS_MS = [round(1.3 ** i, 2) for i in range(45)]
+TRACE_FILE = "traces.jsonl"
+TRACE_RING_SIZE = 500  # Spans kept; the file is compacted back to this many lines
+
+_METRICS_LOCK = threading.Lock()
+_METRICS = {}      # name -> histogram; names are "call:<export>", "api:<endpoint>", "queue:<pool>", ...
+_SPAN_LOCAL = threading.local()
+_TRACING = {"enabled": False, "written": 0}
+_TRACE_RING = deque(maxlen=TRACE_RING_SIZE)
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(METRICS_BUCKETS_MS) + 1)
+        self.count = self.errors = self.timeouts = self.bytes = 0
+        self.total_ms = self.max_ms = 0.0
+
+    def add(self, elapsed_ms, error=False, timeout=False, nbytes=0):
+        index = next((i for i, bound in enumerate(METRICS_BUCKETS_MS) if elapsed_ms <= bound), len(METRICS_BUCKETS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.errors += bool(error)
+        self.timeouts += bool(timeout)
+        self.bytes += nbytes
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, fraction):
+        rank, seen = fraction * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = METRICS_BUCKETS_MS[index] if index < len(METRICS_BUCKETS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 1)
+        return None
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "bytes": self.bytes,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 1)
+        }
+
+def record_metric(name, elapsed_ms, error=False, timeout=False, nbytes=0):
+    with _METRICS_LOCK:
+        histogram = _METRICS.get(name)
+        if histogram is None:
+            histogram = _METRICS[name] = _Histogram()
+        histogram.add(elapsed_ms, error, timeout, nbytes)
+
+def _span_phase(phase, elapsed_ms, nbytes=0):
+    """Add time spent in a phase (network, serialize, queue) to the current span"""
+    span = getattr(_SPAN_LOCAL, "span", None)
+    if span is not None:
+        span[phase + "_ms"] = round(span.get(phase + "_ms", 0) + elapsed_ms, 2)
+        if nbytes:
+            span["bytes"] = span.get("bytes", 0) + nbytes
+
+def _is_error_payload(result):
+    """(is_error, is_timeout) for a safe_api_call dict or a json_response string"""
+    if isinstance(result, dict):
+        return "error" in result, result.get("type") == "TimeoutError"
+    if not isinstance(result, str):
+        return False, False
+    return result.startswith('{"error"'), "TimeoutError" in result[:64]
+
+def instrumented(name):
+    """Record latency, errors and output size of each call, and trace it as a span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = getattr(_SPAN_LOCAL, "span", None)
+            span = {"name": name, "start": time.time()}
+            queue_ms = getattr(_SPAN_LOCAL, "queue_ms", None)
+            if parent is None and queue_ms is not None:
+                span["queue_ms"] = queue_ms
+                _SPAN_LOCAL.queue_ms = None
+            _SPAN_LOCAL.span = span
+            started = time.perf_counter()
+            result, error, timeout = None, False, False
+            try:
+                result = func(*args, **kwargs)
+                error, timeout = _is_error_payload(result)
+                return result
+            except Exception as e:
+                error, timeout = True, isinstance(e, (FutureTimeoutError, asyncio.TimeoutError, TimeoutError))
+                span["error"] = f"{e.__class__.__name__}: {e}"
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                _SPAN_LOCAL.span = parent
+                nbytes = len(result) if isinstance(result, (str, bytes)) else 0
+                record_metric("call:" + name, elapsed_ms, error, timeout, nbytes)
+                if parent is not None:
+                    _span_phase("nested", elapsed_ms)
+                elif _TRACING["enabled"]:
+                    span.update(duration_ms=round(elapsed_ms, 2), error=span.get("error", error), timeout=timeout)
+                    _write_span(span)
+        return wrapper
+    return decorator
+
+def _trace_path():
+    return os.path.join(STORAGE_PATH, TRACE_FILE)
+
+def _write_span(span):
+    """Append span to the trace file, rewriting it from the ring once it doubles"""
+    line = json.dumps(span, separators=(',', ':'), default=str)
+    with _METRICS_LOCK:
+        _TRACE_RING.append(line)
+        _TRACING["written"] += 1
+        try:
+            if _TRACING["written"] % TRACE_RING_SIZE == 0:
+                with open(_trace_path(), "w") as f:
+                    f.write("\n".join(_TRACE_RING) + "\n")
+            else:
+                with open(_trace_path(), "a") as f:
+                    f.write(line + "\n")
+        except OSError:
+            pass
+
+def set_tracing(enabled=True):
+    """Turn span tracing to TRACE_FILE (in STORAGE_PATH) on or off"""
+    _TRACING["enabled"] = bool(enabled)
+    return json_response(dict(_TRACING, path=_trace_path(), ring_size=TRACE_RING_SIZE))
+
+def get_metrics(reset=False):
+    """Latency histograms per exported call, upstream endpoint, serialization and executor queue"""
+    with _METRICS_LOCK:
+        metrics = {}
+        for name, histogram in sorted(_METRICS.items()):
+            kind, _, label = name.partition(":")
+            metrics.setdefault(kind, {})[label] = histogram.summary()
+        if reset:
+            _METRICS.clear()
+    metrics["tracing"] = dict(_TRACING, ring_size=TRACE_RING_SIZE)
+    return json_response(metrics)
+
+def _instrument_exports():
+    """Wrap every exported function in place so bridge calls (globals() lookups) are measured"""
+    for name in EXPORTED_FUNCTIONS:
+        func = globals().get(name)
+        if func is not None and not getattr(func, "__instrumented__", False):
+            wrapper = instrumented(name)(func)
+            wrapper.__instrumented__ = True
+            globals()[name] = wrapper
+
 # ─────────────────────────────────────────────
 # ⚡ API Response Helpers
 # ─────────────────────────────────────────────
 
 def safe_api_call(func, *args, **kwargs):
     """Wrapper for safe API calls with timeout"""
+    started = time.perf_counter()
     try:
-        # Set a timeout for the future (5 seconds)
-        future = _EXECUTOR.submit(func, *args, **kwargs)
-        result = future.result(timeout=5)  # Set timeout here
-        return result
-    except FutureTimeoutError:
-        return {"error": "TimeoutError", "type": "TimeoutError"}
+        result = submit_api_call(func, *args, **kwargs).result()
+    except (FutureTimeoutError, asyncio.TimeoutError):
+        result = {"error": "TimeoutError", "type": "TimeoutError"}
     except Exception as e:
-        return {"error": str(e), "type": e.__class__.__name__}
+        result = {"error": str(e), "type": e.__class__.__name__}
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    error, timeout = _is_error_payload(result)
+    record_metric("api:" + getattr(func, "__name__", "default"), elapsed_ms, error, timeout)
+    _span_phase("network", elapsed_ms)
+    return result
+
+# Response encoding, adjustable at runtime through set_response_encoding
+RESPONSE_ENCODING = {
+    "backend": "auto",           # "auto" (orjson when installed), "orjson" or "json"
+    "compact": False,            # Drop payload the app never reads: fewer bridge bytes, one more tree walk
+    "compress_threshold": None,  # Bytes; larger responses are sent as "zlib:" + base64
+}
+
+# Fields the app never reads; dropped in compact mode
+COMPACT_DROP_KEYS = ("streamingData", "microformat")
+COMPACT_THUMBNAIL_KEYS = ("thumbnails", "thumbnail")
+
+_orjson = None
+_DROPPED = object()
+
+def _dumps_json(data):
+    return json.dumps(data, separators=(',', ':'))
+
+def _dumps_orjson(data):
+    try:
+        return _orjson.dumps(data, option=_orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        return _dumps_json(data)  # Types orjson refuses (e.g. tuple subclasses)
+
+def _json_encoder():
+    global _orjson
+    if RESPONSE_ENCODING["backend"] in ("auto", "orjson") and _orjson is None:
+        try:
+            import orjson
+            _orjson = orjson
+        except ImportError:
+            _orjson = False
+    return _dumps_orjson if RESPONSE_ENCODING["backend"] != "json" and _orjson else _dumps_json
+
+def compact_payload(data):
+    """
+    data without unread fields; thumbnail lists keep only the largest (last) entry.
+    Only containers that change are copied, but the whole tree is still walked,
+    so compact mode costs serialization CPU in exchange for smaller responses.
+    """
+    if isinstance(data, dict):
+        changed = {}
+        for key, value in data.items():
+            if key in COMPACT_DROP_KEYS:
+                changed[key] = _DROPPED
+                continue
+            if key in COMPACT_THUMBNAIL_KEYS and isinstance(value, list) and len(value) > 1:
+                compacted = compact_payload(value[-1:])
+            else:
+                compacted = compact_payload(value)
+            if compacted is not value:
+                changed[key] = compacted
+        if not changed:
+            return data
+        return {key: changed.get(key, value) for key, value in data.items() if changed.get(key) is not _DROPPED}
+    if isinstance(data, list):
+        compacted = [compact_payload(item) for item in data]
+        return compacted if any(new is not old for new, old in zip(compacted, data)) else data
+    return data
 
 def json_response(data, compress=False):
+    started = time.perf_counter()
+    result = _encode_response(data, compress)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    record_metric("serialize:" + ("orjson" if _json_encoder() is _dumps_orjson else "json"), elapsed_ms, nbytes=len(result))
+    _span_phase("serialize", elapsed_ms, len(result))
+    return result
+
+def _encode_response(data, compress):
     """Optimized JSON response with optional compression"""
-    json_str = json.dumps(data, separators=(',', ':'))
-    return zlib.compress(json_str.encode()) if compress else json_str
+    if RESPONSE_ENCODING["compact"]:
+        data = compact_payload(data)
+    json_str = _json_encoder()(data)
+    if compress:
+        return zlib.compress(json_str.encode())
+    threshold = RESPONSE_ENCODING["compress_threshold"]
+    if threshold and len(json_str) > threshold:
+        return "zlib:" + base64.b64encode(zlib.compress(json_str.encode(), 1)).decode()
+    return json_str
+
+def set_response_encoding(backend=None, compact=None, compress_threshold=None):
+    """Update RESPONSE_ENCODING; arguments left as None keep their value"""
+    if backend is not None:
+        if backend not in ("auto", "orjson", "json"):
+            return json_response({"error": f"Unknown backend: {backend}"})
+        RESPONSE_ENCODING["backend"] = backend
+    if compact is not None:
+        RESPONSE_ENCODING["compact"] = bool(compact)
+    if compress_threshold is not None:
+        RESPONSE_ENCODING["compress_threshold"] = int(compress_threshold) or None
+    return json_response(dict(RESPONSE_ENCODING, orjson_available=bool(_json_encoder() is _dumps_orjson)))
+
+# ─────────────────────────────────────────────
+# 🧠 Memory Cache Manager
+# ─────────────────────────────────────────────
+
+MEMORY_CACHE_BUDGET = 24 * 1024 * 1024   # Bytes shared by every MemoryCache
+MEMORY_RSS_SOFT_LIMIT_KB = 350_000       # Above this RSS, caches shrink to half the budget
+
+_MEMORY_CACHES = {}
+_MEMORY_LOCK = threading.RLock()
+_MEMORY_STATE = {"bytes": 0, "clock": 0.0, "trims": 0}
+
+def _estimate_size(value, _depth=0):
+    """Rough byte size of a cached value (containers walked a few levels deep)"""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_estimate_size(item, _depth + 1) for item in value)
+    return size
+
+def _gds_priority(cost, size):
+    # GreedyDual-Size: slow-to-fetch and small entries are worth keeping longer
+    return _MEMORY_STATE["clock"] + (1 + cost * 1000) / max(size / 1024, 1)
+
+class MemoryCache:
+    """
+    In-memory cache whose entries count against MEMORY_CACHE_BUDGET.
+    `cost` is the seconds it took to produce a value; when over budget the
+    entry with the lowest cost-per-byte priority is evicted first.
+    """
+
+    def __init__(self, name, max_entries=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._entries = {}  # key -> [value, size, priority, cost]
+        _MEMORY_CACHES[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None, is_valid=None):
+        with _MEMORY_LOCK:
+            entry = self._entries.get(key)
+            if entry is not None and is_valid is not None and not is_valid(entry[0]):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            self.stats["hits"] += 1
+            entry[2] = _gds_priority(entry[3], entry[1])
+            return entry[0]
+
+    def put(self, key, value, cost=0.0):
+        size = _estimate_size(key) + _estimate_size(value)
+        with _MEMORY_LOCK:
+            self._remove(key)
+            self._entries[key] = [value, size, _gds_priority(cost, size), cost]
+            self.bytes += size
+            _MEMORY_STATE["bytes"] += size
+            if self.max_entries and len(self._entries) > self.max_entries:
+                self._evict(self._lowest()[0])
+            trim_memory_caches(MEMORY_CACHE_BUDGET)
+
+    def pop(self, key):
+        with _MEMORY_LOCK:
+            entry = self._remove(key)
+        return entry[0] if entry else None
+
+    def items(self):
+        with _MEMORY_LOCK:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def clear(self):
+        with _MEMORY_LOCK:
+            _MEMORY_STATE["bytes"] -= self.bytes
+            self._entries.clear()
+            self.bytes = 0
+
+    def info(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            entries=len(self._entries),
+            bytes=self.bytes,
+            hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else None
+        )
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+            _MEMORY_STATE["bytes"] -= entry[1]
+        return entry
+
+    def _lowest(self):
+        return min(self._entries.items(), key=lambda item: item[1][2], default=None)
+
+    def _evict(self, key):
+        entry = self._remove(key)
+        self.stats["evictions"] += 1
+        _MEMORY_STATE["clock"] = max(_MEMORY_STATE["clock"], entry[2])
+
+def trim_memory_caches(budget):
+    """Evict lowest-priority entries across all caches until under budget"""
+    with _MEMORY_LOCK:
+        while _MEMORY_STATE["bytes"] > budget:
+            candidates = [(cache, cache._lowest()) for cache in _MEMORY_CACHES.values() if len(cache)]
+            if not candidates:
+                break
+            cache, (key, _) = min(candidates, key=lambda item: item[1][1][2])
+            cache._evict(key)
+
+def memory_cached(name, max_entries=None):
+    """
+    Memoize a JSON-returning function in a MemoryCache; error responses are not
+    kept. Entries are keyed on RESPONSE_ENCODING too, since they hold encoded text.
+    """
+    def decorator(func):
+        cache = MemoryCache(name, max_entries)
+
+        @wraps(func)
+        def wrapper(*args):
+            key = (args, tuple(RESPONSE_ENCODING.values()))
+            value = cache.get(key)
+            if value is not None:
+                return value
+            start = time.perf_counter()
+            value = func(*args)
+            if not value.startswith('{"error"'):
+                cache.put(key, value, cost=time.perf_counter() - start)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_info = cache.info
+        return wrapper
+    return decorator
+
+# ─────────────────────────────────────────────
+# 💾 Persistent Response Cache
+# ─────────────────────────────────────────────
+
+RESPONSE_CACHE_DB = "response_cache.db"
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_STALE_WINDOW = 7 * 24 * 3600  # Serve stale entries (and revalidate) up to this age
+
+# Seconds a response stays fresh, per endpoint
+RESPONSE_CACHE_TTL = {
+    "get_artist": 6 * 3600,
+    "get_album": 24 * 3600,
+    "get_playlist": 30 * 60,
+}
+
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_RESPONSE_CACHE_STATS = {"hits": 0, "stale_hits": 0, "misses": 0, "offline_hits": 0, "evictions": 0}
+_REVALIDATE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_REVALIDATING = set()
+_sqlite_connections = {}
+_response_cache_ready = False
+
+def _open_sqlite(filename):
+    """Shared connection to a database under STORAGE_PATH, or None if unavailable"""
+    if filename not in _sqlite_connections:
+        try:
+            conn = sqlite3.connect(
+                os.path.join(STORAGE_PATH, filename),
+                check_same_thread=False,
+                isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            conn = None
+        _sqlite_connections[filename] = conn
+    return _sqlite_connections[filename]
+
+def _response_cache_db():
+    global _response_cache_ready
+    conn = _open_sqlite(RESPONSE_CACHE_DB)
+    if conn is not None and not _response_cache_ready:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        _response_cache_ready = True
+    return conn
+
+def _is_error_result(data):
+    return isinstance(data, dict) and "error" in data and "type" in data
+
+def _response_cache_get(key):
+    with _RESPONSE_CACHE_LOCK:
+        conn = _response_cache_db()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT payload, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    return json.loads(zlib.decompress(row[0])), row[1]
+
+def _response_cache_put(key, endpoint, data):
+    payload = zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+    now = time.time()
+    with _RESPONSE_CACHE_LOCK:
+        conn = _response_cache_db()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, payload, len(payload), now, now)
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > RESPONSE_CACHE_MAX_BYTES:
+            # Evict least recently read entries until we are back under budget
+            for old_key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ).fetchall():
+                if total <= RESPONSE_CACHE_MAX_BYTES:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= size
+                _RESPONSE_CACHE_STATS["evictions"] += 1
+
+def _response_cache_key(endpoint, args, kwargs):
+    return endpoint + ":" + json.dumps([args, kwargs], sort_keys=True, default=str)
+
+def invalidate_response(endpoint, *args, **kwargs):
+    """Forget the cached response to endpoint(*args, **kwargs), e.g. after a mutation"""
+    key = _response_cache_key(endpoint, args, kwargs)
+    with _RESPONSE_CACHE_LOCK:
+        conn = _response_cache_db()
+        if conn is not None:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+def _revalidate(key, endpoint, func, args, kwargs):
+    try:
+        data = safe_api_call(func, *args, **kwargs)
+        if not _is_error_result(data):
+            _response_cache_put(key, endpoint, data)
+    finally:
+        _REVALIDATING.discard(key)
+
+def cached_api_call(endpoint, func, *args, **kwargs):
+    """
+    safe_api_call backed by the on-disk response cache.
+    Fresh entries are returned directly; stale ones are returned while a
+    background refresh runs; expired ones are only used if upstream fails.
+    """
+    key = _response_cache_key(endpoint, args, kwargs)
+    cached = _response_cache_get(key)
+    if cached is not None:
+        data, created_at = cached
+        age = time.time() - created_at
+        if age < RESPONSE_CACHE_TTL.get(endpoint, 0):
+            _RESPONSE_CACHE_STATS["hits"] += 1
+            return data
+        if age < RESPONSE_CACHE_STALE_WINDOW:
+            _RESPONSE_CACHE_STATS["stale_hits"] += 1
+            if key not in _REVALIDATING:
+                _REVALIDATING.add(key)
+                _REVALIDATE_EXECUTOR.submit(run_in_lane, "background", _revalidate, key, endpoint, func, args, kwargs)
+            return data
+
+    _RESPONSE_CACHE_STATS["misses"] += 1
+    data = safe_api_call(func, *args, **kwargs)
+    if not _is_error_result(data):
+        _response_cache_put(key, endpoint, data)
+    elif cached is not None:
+        # Upstream unreachable: an old answer beats an error screen
+        _RESPONSE_CACHE_STATS["offline_hits"] += 1
+        return cached[0]
+    return data
+
+def get_response_cache_info():
+    with _RESPONSE_CACHE_LOCK:
+        conn = _response_cache_db()
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone() if conn is not None else (0, 0)
+    return dict(_RESPONSE_CACHE_STATS, entries=entries, bytes=size, max_bytes=RESPONSE_CACHE_MAX_BYTES)
+
+def clear_response_cache():
+    with _RESPONSE_CACHE_LOCK:
+        conn = _response_cache_db()
+        if conn is not None:
+            conn.execute("DELETE FROM responses")
 
 # ─────────────────────────────────────────────
 # 🎵 Music Streaming
 # ─────────────────────────────────────────────
 
-def stream_music(video_id):
+# Stream URL cache: video_id -> {"url", "expires_at", "last_used"}
+STREAM_CACHE_MAX_ENTRIES = 64
+STREAM_REFRESH_MARGIN = 300       # Refresh entries this many seconds before expiry
+STREAM_REFRESH_IDLE_LIMIT = 3600  # Stop refreshing entries unused for this long
+STREAM_DEFAULT_TTL = 3600         # Assumed lifetime when the URL has no expire param
+STREAM_MIN_VALIDITY = 60          # Never hand out a URL closer than this to expiry
+
+_STREAM_CACHE = MemoryCache("stream", STREAM_CACHE_MAX_ENTRIES)
+_STREAM_CACHE_STATS = {"expired": 0, "refreshes": 0, "refresh_errors": 0}
+_stream_refresher = None
+
+def _parse_stream_expiry(url):
+    """Read the signed `expire` timestamp from a googlevideo URL"""
     try:
-        ydl = get_ytdl()
+        expire = parse_qs(urlparse(url).query).get("expire")
+        if expire:
+            return float(expire[0])
+    except (ValueError, TypeError):
+        pass
+    return time.time() + STREAM_DEFAULT_TTL
+
+def _resolve_stream_url(video_id):
+    with pooled_ytdl() as ydl:
         info = ydl.extract_info(
             f"https://www.youtube.com/watch?v={video_id}",
             download=False,
             process=False
         )
-        streaming_url = info.get('url') or info.get('formats')[0]['url']
-        return json_response({"url": streaming_url})
+    return info.get('url') or info.get('formats')[0]['url']
+
+def _store_stream_url(video_id, url, last_used=None, cost=0.0):
+    previous = _STREAM_CACHE.pop(video_id)
+    _STREAM_CACHE.put(video_id, {
+        "url": url,
+        "expires_at": _parse_stream_expiry(url),
+        "last_used": last_used or (previous["last_used"] if previous else time.time()),
+    }, cost=cost)
+    _ensure_stream_refresher()
+
+def _stream_entry_valid(entry):
+    if entry["expires_at"] - time.time() > STREAM_MIN_VALIDITY:
+        return True
+    _STREAM_CACHE_STATS["expired"] += 1
+    return False
+
+def get_stream_url(video_id):
+    """Return a playable URL for video_id, serving unexpired cached URLs instantly"""
+    now = time.time()
+    entry = _STREAM_CACHE.get(video_id, is_valid=_stream_entry_valid)
+    if entry is not None:
+        entry["last_used"] = now
+        return entry["url"]
+
+    future, is_leader = _join_or_lead(("stream_music", video_id), Future)
+    if not is_leader:
+        return future.result()  # Another caller is already resolving this video
+    try:
+        url = call_with_policy("stream_music", _resolve_stream_url, video_id)
+        elapsed = time.time() - now
+        record_metric("api:extract_info", elapsed * 1000)
+        _span_phase("network", elapsed * 1000)
+        _store_stream_url(video_id, url, last_used=now, cost=elapsed)
+        future.set_result(url)
+    except Exception as e:
+        future.set_exception(e)
+    return future.result()
+
+def _refresh_stream_cache():
+    """Background worker: re-resolve recently used URLs shortly before they expire"""
+    while True:
+        time.sleep(30)
+        now = time.time()
+        due = [
+            video_id for video_id, entry in _STREAM_CACHE.items()
+            if entry["expires_at"] - now < STREAM_REFRESH_MARGIN
+            and now - entry["last_used"] < STREAM_REFRESH_IDLE_LIMIT
+        ]
+        for video_id in due:
+            try:
+                started = time.time()
+                url = _resolve_stream_url(video_id)
+                _store_stream_url(video_id, url, cost=time.time() - started)
+                _STREAM_CACHE_STATS["refreshes"] += 1
+            except Exception:
+                _STREAM_CACHE_STATS["refresh_errors"] += 1
+
+def _ensure_stream_refresher():
+    global _stream_refresher
+    if _stream_refresher is None:
+        _stream_refresher = threading.Thread(target=_refresh_stream_cache, daemon=True)
+        _stream_refresher.start()
+
+def clear_stream_cache():
+    _STREAM_CACHE.clear()
+
+def stream_music(video_id):
+    try:
+        url = get_stream_url(video_id)
+        if _STARTUP_PROFILE["first_stream_ms"] is None:
+            _STARTUP_PROFILE["first_stream_ms"] = round((time.perf_counter() - _IMPORT_STARTED_AT) * 1000, 1)
+        return json_response({"url": url})
     except Exception as e:
         return json_response({"error": str(e)})
 
+# ─────────────────────────────────────────────
+# ⏭️ Queue Prefetch
+# ─────────────────────────────────────────────
+
+PREFETCH_DEFAULT_DEPTH = 3
+
+_PREFETCH_LOCK = threading.RLock()
+_PREFETCH_FUTURES = {}
+_PREFETCH_STATS = {"scheduled": 0, "completed": 0, "cancelled": 0, "failed": 0}
+
+def _prefetch_track(video_id):
+    """Resolve stream URL and metadata so the track starts from cache"""
+    with _PREFETCH_LOCK:
+        if video_id not in _PREFETCH_FUTURES:
+            return  # Dropped from the queue before we got to it
+    try:
+        get_stream_url(video_id)
+        get_song(video_id)
+        prefetch_lyrics(video_id)
+        _PREFETCH_STATS["completed"] += 1
+    except Exception:
+        _PREFETCH_STATS["failed"] += 1
+
+def _forget_prefetch(video_id, future):
+    with _PREFETCH_LOCK:
+        if _PREFETCH_FUTURES.get(video_id) is future:
+            del _PREFETCH_FUTURES[video_id]
+
+def prefetch_queue(video_ids, depth=PREFETCH_DEFAULT_DEPTH):
+    """
+    Resolve the next `depth` queue entries in the background.
+    Prefetches for tracks no longer in the queue are cancelled.
+    """
+    targets = []
+    for video_id in video_ids or []:
+        video_id = str(video_id)
+        if video_id not in targets:
+            targets.append(video_id)
+    targets = targets[:max(int(depth), 0)]
+
+    scheduled = []
+    with _PREFETCH_LOCK:
+        for video_id in list(_PREFETCH_FUTURES):
+            if video_id not in targets:
+                if _PREFETCH_FUTURES.pop(video_id).cancel():
+                    _PREFETCH_STATS["cancelled"] += 1
+
+        for video_id in targets:
+            if video_id in _PREFETCH_FUTURES:
+                continue
+            # Background lane of the bridge scheduler, so prefetch extractions
+            # share its capped background capacity and never take playback's
+            future = _BRIDGE_EXECUTOR.submit_to("background", _prefetch_track, video_id)
+            _PREFETCH_FUTURES[video_id] = future
+            future.add_done_callback(lambda f, v=video_id: _forget_prefetch(v, f))
+            _PREFETCH_STATS["scheduled"] += 1
+            scheduled.append(video_id)
+
+    return json_response({"status": "ok", "scheduled": scheduled, "queued": targets})
+
 # ─────────────────────────────────────────────
 # 📋 Library Management
 # ─────────────────────────────────────────────
 
-@lru_cache(maxsize=32)
+@memory_cached("song", max_entries=128)
 def get_song(song_id):
     return json_response(safe_api_call(get_ytmusic().get_song, song_id))
 
-@lru_cache(maxsize=16)
 def get_album(album_id):
-    return json_response(safe_api_call(get_ytmusic().get_album, album_id))
+    return json_response(entity("album", album_id))
 
 def get_playlist(playlist_id):
-    return json_response(safe_api_call(get_ytmusic().get_playlist, playlist_id))
+    return json_response(cached_api_call("get_playlist", get_ytmusic().get_playlist, playlist_id))
 
 def get_watch_playlist(video_id=None):
     return json_response(
@@ -209,26 +1732,77 @@ def get_watch_playlist(video_id=None):
         )
     )
 
+SONG_DETAILS_DEADLINE = 8  # Seconds for the whole fan-out, not per call
+
+def _result_before(future, deadline):
+    """Result of future if it succeeds before deadline, otherwise None"""
+    if future is None:
+        return None
+    try:
+        result = future.result(timeout=max(deadline - time.monotonic(), 0))
+    except Exception:
+        return None
+    return None if _is_error_result(result) else result
+
 def get_song_details(video_id):
     try:
-        watch_playlist = safe_api_call(get_ytmusic().get_watch_playlist, video_id)
+        deadline = time.monotonic() + SONG_DETAILS_DEADLINE
+        ytmusic = get_ytmusic()
+
+        # The song itself does not depend on the watch playlist, so start both
+        watch_future = submit_api_call(ytmusic.get_watch_playlist, video_id)
+        song_future = submit_api_call(ytmusic.get_song, video_id)
+
+        watch_playlist = _result_before(watch_future, deadline)
         if not watch_playlist or "tracks" not in watch_playlist:
             return json_response({"error": "Invalid or non-music video ID"})
 
-        song = safe_api_call(get_ytmusic().get_song, video_id)
         related_id = watch_playlist.get("related")
         lyrics_id = watch_playlist.get("lyrics")
+        stored_lyrics = _stored_lyrics(lyrics_id) if lyrics_id else None
+        lyrics_future = None
+        if lyrics_id and stored_lyrics is None:
+            lyrics_future = submit_api_call(ytmusic.get_lyrics, lyrics_id)
+            # Done-callbacks run on the engine loop, so the SQLite write goes elsewhere
+            lyrics_future.add_done_callback(
+                lambda f: f.cancelled() or f.exception() or _BRIDGE_EXECUTOR.submit_to(
+                    "background", _store_lyrics, lyrics_id, False, video_id, f.result()
+                )
+            )
+        related_future = submit_api_call(ytmusic.get_song_related, related_id) if related_id else None
+
+        song = _result_before(song_future, deadline) or {}
+        lyrics = stored_lyrics or _result_before(lyrics_future, deadline)
+        related = _result_before(related_future, deadline)
+
+        track = watch_playlist.get("tracks")[0]
+        prefetch_links(ENTITY_PREFETCH["song"], _entity_links("song", track))
+        if isinstance(related, list):
+            _remember_links([
+                (_entity_kind(item["browseId"]), item["browseId"], "related", _entity_summary(item))
+                for section in related if isinstance(section, dict)
+                for item in section.get("contents") or []
+                if isinstance(item, dict) and isinstance(item.get("browseId"), str) and _entity_kind(item["browseId"])
+            ])
 
         response_data = {
-            "track": watch_playlist.get("tracks")[0],
+            "track": track,
             "title": song.get("videoDetails", {}).get("title"),
             "videoId": video_id,
             "artists": song.get("videoDetails", {}).get("author"),
             "thumbnails": song.get("videoDetails", {}).get("thumbnail"),
             "album": song.get("album"),
             "duration": song.get("videoDetails", {}).get("lengthSeconds"),
-            "lyrics": safe_api_call(get_ytmusic().get_lyrics, lyrics_id) if lyrics_id else None,
-            "related": safe_api_call(get_ytmusic().get_song_related, related_id) if related_id else None
+            "lyrics": lyrics,
+            "related": related,
+            # Sections that failed or missed the deadline
+            "missing": [
+                name for name, future, value in (
+                    ("song", song_future, song or None),
+                    ("lyrics", lyrics_future, lyrics),
+                    ("related", related_future, related),
+                ) if future is not None and value is None
+            ]
         }
 
         return json_response(response_data)
@@ -239,112 +1813,936 @@ def get_song_details(video_id):
 # 🔍 Search Functions
 # ─────────────────────────────────────────────
 
+SEARCH_LIMIT = 40
+SEARCH_STREAM_LIMIT = 10  # Top results per category in the first chunks
+SEARCH_STREAM_CATEGORIES = ("songs", "albums", "artists", "playlists")
+SEARCH_STREAM_DEADLINE = 10
+
+_search_stream_id = 0
+
 def search_music(query):
-    def _search():
-        return get_ytmusic().search(query, limit=40, ignore_spelling=True)
-    
-    future = _EXECUTOR.submit(_search)
-    return json_response(future.result())
+    if _offline:
+        return json_response(search_local_items(query))
+    results = safe_api_call(get_ytmusic().search, query, limit=SEARCH_LIMIT, ignore_spelling=True)
+    if _is_error_result(results):
+        # Upstream failed; local matches are better than an error
+        return json_response(search_local_items(query) or results)
+    return json_response(results)
+
+def _search_result_id(item):
+    return item.get("videoId") or item.get("browseId") or item.get("playlistId")
+
+def _run_search_stream(emitter, stream_id, query):
+    deadline = time.monotonic() + SEARCH_STREAM_DEADLINE
+    local = search_local_items(query)
+    if local:
+        emitter.chunk(json_response({"stream": stream_id, "category": "local", "results": local, "done": False}))
+    if _offline:
+        emitter.chunk(json_response({"stream": stream_id, "done": True, "timed_out": []}))
+        return
+
+    ytmusic = get_ytmusic()
+    futures = {
+        submit_api_call(ytmusic.search, query, filter=category,
+                        limit=SEARCH_STREAM_LIMIT, ignore_spelling=True): category
+        for category in SEARCH_STREAM_CATEGORIES
+    }
+    # The unfiltered page arrives later and only adds what was not sent yet
+    futures[submit_api_call(ytmusic.search, query, limit=SEARCH_LIMIT, ignore_spelling=True)] = "more"
+
+    sent = set()
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+            pending.discard(future)
+            if stream_id != _search_stream_id:
+                return  # A newer search replaced this one
+            results = _result_before(future, deadline)
+            if not isinstance(results, list):
+                continue
+            fresh = []
+            for item in results:
+                item_id = _search_result_id(item)
+                if item_id is None or item_id not in sent:
+                    sent.add(item_id)
+                    fresh.append(item)
+            emitter.chunk(json_response({
+                "stream": stream_id,
+                "category": futures[future],
+                "results": fresh,
+                "done": False
+            }))
+    except FutureTimeoutError:
+        pass
+
+    if stream_id == _search_stream_id:
+        emitter.chunk(json_response({
+            "stream": stream_id,
+            "done": True,
+            "timed_out": [futures[future] for future in pending]
+        }))
+
+def search_music_stream(emitter, query):
+    """
+    Incremental search: top results per category are pushed through
+    emitter.chunk(json) as soon as each arrives, followed by the rest of the
+    full result page and a final {"done": true} chunk.
+    Returns the stream id immediately.
+    """
+    global _search_stream_id
+    _search_stream_id += 1
+    _BRIDGE_EXECUTOR.submit(_run_search_stream, emitter, _search_stream_id, query)
+    return json_response({"stream": _search_stream_id})
+
+# Suggestion cache: prefix trie of recent responses, one trie per `detailed` flag
+SUGGESTION_CACHE_MAX_ENTRIES = 256
+SUGGESTION_CACHE_TTL = 600
+SUGGESTION_MIN_LOCAL = 3      # Answer from a cached prefix when it still yields this many matches
+SUGGESTION_DEBOUNCE = 0.15    # Seconds to wait for a newer keystroke before going upstream
+
+_SUGGESTION_TRIES = {False: {}, True: {}}   # Trie nodes mark cached queries with a None key
+_SUGGESTION_CACHE = MemoryCache("suggestions", SUGGESTION_CACHE_MAX_ENTRIES)
+_SUGGESTION_LOCK = threading.Lock()
+_SUGGESTION_STATS = {"exact_hits": 0, "prefix_hits": 0, "upstream": 0, "debounced": 0}
+_suggestion_generation = 0
+
+def _normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+def _suggestion_text(item):
+    return item.get("text", "") if isinstance(item, dict) else str(item)
+
+def _suggestion_fresh(entry):
+    return time.time() - entry[1] < SUGGESTION_CACHE_TTL
+
+def _suggestion_lookup(query, detailed):
+    """Return (results, exact) from the deepest fresh cached prefix of query"""
+    node = _SUGGESTION_TRIES[detailed]
+    marked = []
+    with _SUGGESTION_LOCK:
+        for depth in range(len(query) + 1):
+            if None in node:
+                marked.append((depth, node))
+            if depth == len(query):
+                break
+            node = node.get(query[depth])
+            if node is None:
+                break
+
+    for depth, node in reversed(marked):
+        entry = _SUGGESTION_CACHE.get((query[:depth], detailed), is_valid=_suggestion_fresh)
+        if entry is None:
+            node.pop(None, None)  # Evicted or expired
+            continue
+        if depth == len(query):
+            return entry[0], True
+        return [item for item in entry[0] if _normalize_query(_suggestion_text(item)).startswith(query)], False
+    return None, False
+
+def _suggestion_store(query, detailed, results, cost=0.0):
+    with _SUGGESTION_LOCK:
+        node = _SUGGESTION_TRIES[detailed]
+        for char in query:
+            node = node.setdefault(char, {})
+        node[None] = True
+    _SUGGESTION_CACHE.put((query, detailed), (results, time.time()), cost=cost)
 
 def get_search_suggestions(query, detailed=False):
-    return json_response(
-        safe_api_call(
-            get_ytmusic().get_search_suggestions,
-            query,
-            detailed_runs=detailed
-        )
+    global _suggestion_generation
+    normalized = _normalize_query(query)
+    detailed = bool(detailed)
+
+    local, exact = _suggestion_lookup(normalized, detailed)
+    if exact:
+        _SUGGESTION_STATS["exact_hits"] += 1
+        return json_response(local)
+    if local is not None and len(local) >= SUGGESTION_MIN_LOCAL:
+        _SUGGESTION_STATS["prefix_hits"] += 1
+        return json_response(local)
+
+    # Debounce: only the latest keystroke goes upstream
+    _suggestion_generation += 1
+    generation = _suggestion_generation
+    time.sleep(SUGGESTION_DEBOUNCE)
+    if generation != _suggestion_generation:
+        _SUGGESTION_STATS["debounced"] += 1
+        return json_response(local or [])
+
+    _SUGGESTION_STATS["upstream"] += 1
+    started = time.perf_counter()
+    results = safe_api_call(
+        get_ytmusic().get_search_suggestions,
+        query,
+        detailed_runs=detailed
     )
+    if isinstance(results, list):
+        _suggestion_store(normalized, detailed, results, cost=time.perf_counter() - started)
+    return json_response(results)
 
 # ─────────────────────────────────────────────
-# 🏠 Home & Categories
+# 🏠 Home & Categories (feed service)
 # ─────────────────────────────────────────────
 
+FEEDS_DB = "feeds.db"
+FEED_HISTORY = 4                # Past versions kept per feed for deltas
+FEED_CHECK_INTERVAL = 60        # Seconds between scheduled refresh passes
+FEED_IDLE_LIMIT = 3 * 24 * 3600 # Feeds unread for this long are not refreshed on schedule
+CHART_ITEM_SECTIONS = ("songs", "videos", "trending")
+
+_FEED_LOCK = threading.Lock()
+_FEED_SNAPSHOTS = {}      # feed key -> {"version", "data", "fetched_at", "last_read"}
+_FEED_RESPONSES = {}      # feed key -> (version, encoding, serialized data)
+_FEED_REFRESHING = set()
+_FEED_STATS = {"snapshot_hits": 0, "cold_fetches": 0, "refreshes": 0, "unchanged": 0, "refresh_errors": 0, "deltas": 0}
+_feeds_ready = False
+_feed_refresher = None
+
+def _feed_item_id(item):
+    if not isinstance(item, dict):
+        return None
+    return next((item[k] for k in ("videoId", "playlistId", "browseId", "audioPlaylistId") if item.get(k)), None)
+
+def normalize_home(sections):
+    """Drop empty sections and id-less or duplicate items"""
+    if not isinstance(sections, list):
+        return sections
+    normalized = []
+    for section in sections:
+        seen, contents = set(), []
+        for item in (section.get("contents") if isinstance(section, dict) else None) or []:
+            item_id = _feed_item_id(item)
+            if item_id and item_id not in seen:
+                seen.add(item_id)
+                contents.append(item)
+        if contents:
+            normalized.append(dict(section, contents=contents))
+    return normalized
+
+def normalize_charts(charts):
+    """Keep only chart items that can be played"""
+    if not isinstance(charts, dict):
+        return charts
+    for section in CHART_ITEM_SECTIONS:
+        if isinstance(charts.get(section), dict) and "items" in charts[section]:
+            charts[section]["items"] = [
+                item for item in charts[section]["items"] if isinstance(item.get("videoId"), str)
+            ]
+    return charts
+
+def normalize_mood_playlists(playlists):
+    if not isinstance(playlists, list):
+        return playlists
+    return [playlist for playlist in playlists if playlist.get("playlistId")]
+
+# name -> (ytmusicapi method, normalizer, refresh interval in seconds)
+FEEDS = {
+    "home": ("get_home", normalize_home, 15 * 60),
+    "charts": ("get_charts", normalize_charts, 3 * 3600),
+    "mood_categories": ("get_mood_categories", None, 12 * 3600),
+    "mood_playlists": ("get_mood_playlists", normalize_mood_playlists, 3 * 3600),
+}
+
+def _feeds_db():
+    global _feeds_ready
+    conn = _open_sqlite(FEEDS_DB)
+    if conn is not None and not _feeds_ready:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feed_versions (
+                feed TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (feed, version)
+            );
+            CREATE INDEX IF NOT EXISTS feed_versions_latest ON feed_versions (feed, fetched_at);
+        """)
+        _feeds_ready = True
+    return conn
+
+def _feed_key(name, arg=None):
+    return name if arg is None else f"{name}:{arg}"
+
+def _stored_feed(key, version=None):
+    """(version, data, fetched_at) for the latest or the given version of a feed"""
+    with _FEED_LOCK:
+        conn = _feeds_db()
+        if conn is None:
+            return None
+        if version is None:
+            row = conn.execute(
+                "SELECT version, payload, fetched_at FROM feed_versions WHERE feed = ? ORDER BY fetched_at DESC LIMIT 1",
+                (key,)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT version, payload, fetched_at FROM feed_versions WHERE feed = ? AND version = ?",
+                (key, version)
+            ).fetchone()
+    return (row[0], json.loads(row[1]), row[2]) if row else None
+
+def refresh_feed(name, arg=None):
+    """Fetch, normalize and store a feed; returns its snapshot, or the error"""
+    method, normalize, _ = FEEDS[name]
+    key = _feed_key(name, arg)
+    data = safe_api_call(getattr(get_ytmusic(), method), *(() if arg is None else (arg,)))
+    if _is_error_result(data):
+        _FEED_STATS["refresh_errors"] += 1
+        return data
+    if normalize is not None:
+        data = normalize(data)
+    payload = json.dumps(data, separators=(',', ':'))
+    version = hashlib.sha1(payload.encode()).hexdigest()[:16]
+    now = time.time()
+
+    previous = _FEED_SNAPSHOTS.get(key)
+    if previous is not None and previous["version"] == version:
+        _FEED_STATS["unchanged"] += 1
+        previous["fetched_at"] = now
+    _FEED_STATS["refreshes"] += 1
+    with _FEED_LOCK:
+        conn = _feeds_db()
+        if conn is not None:
+            conn.execute("INSERT OR REPLACE INTO feed_versions VALUES (?, ?, ?, ?)", (key, version, payload, now))
+            conn.execute("""
+                DELETE FROM feed_versions WHERE feed = ? AND version NOT IN (
+                    SELECT version FROM feed_versions WHERE feed = ? ORDER BY fetched_at DESC LIMIT ?
+                )
+            """, (key, key, FEED_HISTORY))
+        snapshot = {
+            "version": version,
+            "data": data,
+            "fetched_at": now,
+            "last_read": previous["last_read"] if previous else now
+        }
+        _FEED_SNAPSHOTS[key] = snapshot
+    return snapshot
+
+def _background_refresh(name, arg):
+    try:
+        refresh_feed(name, arg)
+    finally:
+        _FEED_REFRESHING.discard(_feed_key(name, arg))
+
+def _schedule_refresh(name, arg):
+    key = _feed_key(name, arg)
+    if key not in _FEED_REFRESHING:
+        _FEED_REFRESHING.add(key)
+        _REVALIDATE_EXECUTOR.submit(run_in_lane, "background", _background_refresh, name, arg)
+
+def feed_snapshot(name, arg=None):
+    """
+    Latest snapshot of a feed, served without waiting on the network whenever
+    one exists (a stale one triggers a background refresh). Only the very
+    first read of a feed blocks on upstream.
+    """
+    key = _feed_key(name, arg)
+    snapshot = _FEED_SNAPSHOTS.get(key)
+    if snapshot is None:
+        stored = _stored_feed(key)
+        if stored is not None:
+            snapshot = _FEED_SNAPSHOTS.setdefault(key, {
+                "version": stored[0], "data": stored[1], "fetched_at": stored[2], "last_read": time.time()
+            })
+    if snapshot is None:
+        _FEED_STATS["cold_fetches"] += 1
+        return refresh_feed(name, arg)
+
+    _FEED_STATS["snapshot_hits"] += 1
+    snapshot["last_read"] = time.time()
+    if snapshot["last_read"] - snapshot["fetched_at"] > FEEDS[name][2] and not _offline:
+        _schedule_refresh(name, arg)
+    _ensure_feed_refresher()
+    return snapshot
+
+def _feed_sections(data):
+    """Split a snapshot into ordered (key, value) sections for diffing"""
+    if isinstance(data, dict):
+        return "dict", list(data.items())
+    if isinstance(data, list) and data and all(isinstance(section, dict) and "title" in section for section in data):
+        sections, counts = [], {}
+        for section in data:
+            title = str(section["title"])
+            counts[title] = counts.get(title, 0) + 1
+            sections.append((title if counts[title] == 1 else f"{title}#{counts[title]}", section))
+        return "sections", sections
+    return "list", [("items", data)]
+
+def feed_delta(old, new):
+    """
+    Sections of new that differ from old. The client rebuilds the snapshot by
+    taking `order` and filling each key from `changed`, or else from its copy
+    (dict keys for "dict" feeds, titles for "sections" feeds)
+    """
+    shape, new_sections = _feed_sections(new)
+    _, old_sections = _feed_sections(old)
+    old_by_key = dict(old_sections)
+    return {
+        "shape": shape,
+        "order": [key for key, _ in new_sections],
+        "changed": {key: value for key, value in new_sections if old_by_key.get(key) != value},
+        "removed": [key for key in old_by_key if key not in dict(new_sections)]
+    }
+
+def get_feed(name, arg=None, since=None):
+    """
+    Versioned feed access. With `since` set to a version the client already
+    holds, returns only the sections that changed since then.
+    """
+    if name not in FEEDS:
+        return json_response({"error": f"Unknown feed: {name}"})
+    snapshot = feed_snapshot(name, arg)
+    if _is_error_result(snapshot):
+        return json_response(snapshot)
+    envelope = {"feed": name, "version": snapshot["version"], "fetched_at": snapshot["fetched_at"]}
+    if since == snapshot["version"]:
+        return json_response(dict(envelope, unchanged=True))
+    if since:
+        old = _stored_feed(_feed_key(name, arg), since)
+        if old is not None:
+            _FEED_STATS["deltas"] += 1
+            return json_response(dict(envelope, since=since, delta=feed_delta(old[1], snapshot["data"])))
+    return json_response(dict(envelope, data=snapshot["data"]))
+
+def _feed_response(name, arg=None):
+    """Snapshot data as a response, serialized once per version"""
+    snapshot = feed_snapshot(name, arg)
+    if _is_error_result(snapshot):
+        return json_response(snapshot)
+    key, encoding = _feed_key(name, arg), tuple(RESPONSE_ENCODING.values())
+    cached = _FEED_RESPONSES.get(key)
+    if cached is None or cached[:2] != (snapshot["version"], encoding):
+        cached = _FEED_RESPONSES[key] = (snapshot["version"], encoding, json_response(snapshot["data"]))
+    return cached[2]
+
+def _refresh_feeds():
+    """Background worker: refresh recently read feeds once their interval passes"""
+    while True:
+        time.sleep(FEED_CHECK_INTERVAL)
+        if _offline:
+            continue
+        now = time.time()
+        for key, snapshot in list(_FEED_SNAPSHOTS.items()):
+            name, _, arg = key.partition(":")
+            if now - snapshot["last_read"] < FEED_IDLE_LIMIT and now - snapshot["fetched_at"] > FEEDS[name][2]:
+                _schedule_refresh(name, arg or None)
+
+def _ensure_feed_refresher():
+    global _feed_refresher
+    if _feed_refresher is None:
+        _feed_refresher = threading.Thread(target=_refresh_feeds, daemon=True)
+        _feed_refresher.start()
+
+def get_feed_stats():
+    return dict(_FEED_STATS, feeds={
+        key: {"version": snapshot["version"], "age_s": round(time.time() - snapshot["fetched_at"])}
+        for key, snapshot in list(_FEED_SNAPSHOTS.items())
+    })
+
+def clear_feeds():
+    """Forget every snapshot, in memory and on disk"""
+    with _FEED_LOCK:
+        _FEED_SNAPSHOTS.clear()
+        _FEED_RESPONSES.clear()
+        conn = _feeds_db()
+        if conn is not None:
+            conn.execute("DELETE FROM feed_versions")
+
 def get_home():
-    return json_response(safe_api_call(get_ytmusic().get_home))
+    return _feed_response("home")
 
 def get_mood_categories():
-    return json_response(safe_api_call(get_ytmusic().get_mood_categories))
+    return _feed_response("mood_categories")
 
 def get_mood_playlists(params):
-    return json_response(safe_api_call(get_ytmusic().get_mood_playlists, params))
+    return _feed_response("mood_playlists", params)
 
 def get_charts(country):
-    charts = safe_api_call(get_ytmusic().get_charts, country)
-    if charts and not isinstance(charts, dict):
-        for section in ["songs", "videos", "trending"]:
-            if section in charts and "items" in charts[section]:
-                charts[section]["items"] = [item for item in charts[section]["items"] 
-                                          if isinstance(item.get("videoId"), str)]
-    return json_response(charts)
+    return _feed_response("charts", country)
 
 # ─────────────────────────────────────────────
 # 🎧 Playlist Management
 # ─────────────────────────────────────────────
 
 def create_playlist(title, description, privacy_status="PRIVATE", video_ids=None, source_playlist=None):
-    return json_response(
-        safe_api_call(
-            get_ytmusic().create_playlist,
-            title=title,
-            description=description,
-            privacy_status=privacy_status,
-            video_ids=video_ids,
-            source_playlist=source_playlist
-        )
+    result = safe_api_call(
+        get_ytmusic().create_playlist,
+        title=title,
+        description=description,
+        privacy_status=privacy_status,
+        video_ids=video_ids,
+        source_playlist=source_playlist
     )
+    if not _is_error_result(result):
+        _library_changed("playlists")
+    return json_response(result)
 
 def edit_playlist(playlist_id, title=None, description=None, privacy_status=None,
                   move_item=None, add_playlist_id=None, add_to_top=None):
-    return json_response(
-        safe_api_call(
-            get_ytmusic().edit_playlist,
-            playlistId=playlist_id,
-            title=title,
-            description=description,
-            privacyStatus=privacy_status,
-            moveItem=move_item,
-            addPlaylistId=add_playlist_id,
-            addToTop=add_to_top
-        )
+    result = safe_api_call(
+        get_ytmusic().edit_playlist,
+        playlistId=playlist_id,
+        title=title,
+        description=description,
+        privacyStatus=privacy_status,
+        moveItem=move_item,
+        addPlaylistId=add_playlist_id,
+        addToTop=add_to_top
     )
+    invalidate_response("get_playlist", playlist_id)
+    if not _is_error_result(result) and (title is not None or privacy_status is not None):
+        _library_changed("playlists")
+    return json_response(result)
 
 def delete_playlist(playlist_id):
-    return json_response(safe_api_call(get_ytmusic().delete_playlist, playlist_id))
+    result = safe_api_call(get_ytmusic().delete_playlist, playlist_id)
+    invalidate_response("get_playlist", playlist_id)
+    if not _is_error_result(result):
+        _library_changed("playlists", removed=[playlist_id])
+    return json_response(result)
 
 def add_playlist_items(playlist_id, video_id=None, source_playlist=None, duplicates=False):
     video_ids = [video_id] if video_id is not None else []
-    return json_response(
-        safe_api_call(
-            get_ytmusic().add_playlist_items,
-            playlistId=playlist_id,
-            videoIds=video_ids,
-            source_playlist=source_playlist,
-            duplicates=duplicates
-        )
+    result = safe_api_call(
+        get_ytmusic().add_playlist_items,
+        playlistId=playlist_id,
+        videoIds=video_ids,
+        source_playlist=source_playlist,
+        duplicates=duplicates
     )
+    invalidate_response("get_playlist", playlist_id)
+    return json_response(result)
 
 def remove_playlist_items(playlist_id, video_id, setVideoId):
     video_ids = [{"videoId": video_id, "setVideoId": setVideoId}] if video_id and setVideoId else []
-    return json_response(
-        safe_api_call(
-            get_ytmusic().remove_playlist_items,
-            playlistId=playlist_id,
-            videos=video_ids
-        )
+    result = safe_api_call(
+        get_ytmusic().remove_playlist_items,
+        playlistId=playlist_id,
+        videos=video_ids
     )
+    invalidate_response("get_playlist", playlist_id)
+    return json_response(result)
+
+# ─────────────────────────────────────────────
+# 📚 Library Mirror
+# ─────────────────────────────────────────────
+
+LIBRARY_DB = "library.db"
+LIBRARY_REFRESH_INTERVAL = 5 * 60         # Background refresh when the mirror is older than this
+LIBRARY_FULL_SYNC_INTERVAL = 24 * 3600    # Full resync (catches removals) this often
+LIBRARY_SYNC_PAGE = 25                    # First page size of an incremental sync
+LIBRARY_FULL_SYNC_LIMIT = 5000
+
+# kind -> (ytmusicapi method name, id field, takes a limit)
+LIBRARY_KINDS = {
+    "songs": ("get_library_songs", "videoId", True),
+    "liked": ("get_liked_songs", "videoId", True),
+    "history": ("get_history", "videoId", False),
+    "playlists": ("get_library_playlists", "playlistId", True),
+    "albums": ("get_library_albums", "browseId", True),
+}
+
+_LIBRARY_LOCK = threading.Lock()
+_LIBRARY_EXECUTOR = ThreadPoolExecutor(max_workers=1)  # Syncs don't queue behind revalidation
+_LIBRARY_SYNCING = set()
+_LIBRARY_RESYNC = {}  # kind -> full; changed upstream while a sync was already running
+_LIBRARY_STATS = {
+    "local_reads": 0, "syncs": 0, "full_syncs": 0, "items_added": 0, "items_updated": 0,
+    "items_removed": 0, "sync_errors": 0, "account_resets": 0,
+}
+_library_ready = False
+_library_auth_version = None
+
+def _library_db():
+    global _library_ready
+    conn = _open_sqlite(LIBRARY_DB)
+    if conn is not None and not _library_ready:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS library_items (
+                kind TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                title TEXT,
+                artist TEXT,
+                album TEXT,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (kind, item_id)
+            );
+            CREATE INDEX IF NOT EXISTS library_items_order ON library_items (kind, position);
+            CREATE INDEX IF NOT EXISTS library_items_video ON library_items (item_id);
+            CREATE INDEX IF NOT EXISTS library_items_artist ON library_items (artist);
+            CREATE INDEX IF NOT EXISTS library_items_album ON library_items (album);
+            CREATE TABLE IF NOT EXISTS library_sync (
+                kind TEXT PRIMARY KEY,
+                synced_at REAL NOT NULL,
+                full_synced_at REAL NOT NULL,
+                envelope TEXT
+            );
+            CREATE TABLE IF NOT EXISTS library_account (digest TEXT);
+        """)
+        _library_ready = True
+    if conn is not None:
+        _check_library_account(conn)
+    return conn
+
+def _check_library_account(conn):
+    """
+    Drop the mirror when browser.json changed (logout or another account).
+    Called with _LIBRARY_LOCK held; the mirror records which auth data it
+    was built with, so this also holds across restarts.
+    """
+    global _library_auth_version
+    state = auth_state()
+    if state["version"] == _library_auth_version:
+        return
+    row = conn.execute("SELECT digest FROM library_account").fetchone()
+    if row is None or row[0] != state["digest"]:
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM library_items")
+            conn.execute("DELETE FROM library_sync")
+            conn.execute("DELETE FROM library_account")
+            conn.execute("INSERT INTO library_account VALUES (?)", (state["digest"],))
+            if _fts_enabled(conn):
+                conn.execute("DELETE FROM library_fts")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _LIBRARY_STATS["account_resets"] += 1
+    _library_auth_version = state["version"]
+
+def _library_columns(item):
+    artists = item.get("artists") or []
+    album = item.get("album")
+    return (
+        item.get("title"),
+        ", ".join(a.get("name", "") for a in artists if isinstance(a, dict)) or item.get("artist"),
+        album.get("name") if isinstance(album, dict) else album,
+    )
+
+def _library_fetch(kind, limit):
+    method, _, takes_limit = LIBRARY_KINDS[kind]
+    func = getattr(get_ytmusic(), method)
+    result = safe_api_call(func, limit) if takes_limit else safe_api_call(func)
+    if _is_error_result(result):
+        raise RuntimeError(result["error"])
+    if isinstance(result, dict):  # get_liked_songs wraps tracks in playlist metadata
+        envelope = {k: v for k, v in result.items() if k != "tracks"}
+        return result.get("tracks") or [], envelope
+    return result or [], None
+
+def _library_write(kind, fetched, envelope, full, seed=False, account=None):
+    """
+    Merge fetched items (newest first) ahead of the mirrored ones. Mirrored
+    items above the deepest one fetched again were removed upstream and are
+    dropped. A seed is only the first page of an empty list, so it leaves the
+    list due a full sync. Nothing is written if the account changed since
+    the fetch began.
+    """
+    id_field = LIBRARY_KINDS[kind][1]
+    fetched = [item for item in fetched if item.get(id_field)]
+    fetched_ids = [item[id_field] for item in fetched]
+    now = time.time()
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        if account is not None and account != _library_auth_version:
+            return
+        existing = {
+            row[0]: row[1] for row in
+            conn.execute("SELECT item_id, payload FROM library_items WHERE kind = ? ORDER BY position", (kind,))
+        }
+        if full:
+            order, removed = fetched_ids, []
+        else:
+            seen = set(fetched_ids)
+            mirrored = list(existing)
+            deepest = max((i for i, item_id in enumerate(mirrored) if item_id in seen), default=-1)
+            removed = [item_id for item_id in mirrored[:deepest] if item_id not in seen]
+            order = fetched_ids + [item_id for item_id in mirrored[deepest + 1:] if item_id not in seen]
+
+        conn.execute("BEGIN")
+        try:
+            if full:
+                conn.execute("DELETE FROM library_items WHERE kind = ?", (kind,))
+            conn.executemany(
+                "DELETE FROM library_items WHERE kind = ? AND item_id = ?",
+                [(kind, item_id) for item_id in removed]
+            )
+            _LIBRARY_STATS["items_removed"] += len(removed)
+            for item in fetched:
+                payload = json.dumps(item, separators=(',', ':'))
+                previous = existing.get(item[id_field])
+                if previous == payload and not full:
+                    continue
+                _LIBRARY_STATS["items_added" if previous is None else "items_updated"] += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO library_items VALUES (?, ?, 0, ?, ?, ?, ?)",
+                    (kind, item[id_field], *_library_columns(item), payload)
+                )
+            conn.executemany(
+                "UPDATE library_items SET position = ? WHERE kind = ? AND item_id = ?",
+                [(position, kind, item_id) for position, item_id in enumerate(order)]
+            )
+            _reindex_library(conn, kind)
+            state = conn.execute("SELECT full_synced_at FROM library_sync WHERE kind = ?", (kind,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO library_sync VALUES (?, ?, ?, ?)",
+                (kind, now, 0 if seed else now if full or state is None else state[0],
+                 json.dumps(envelope) if envelope is not None else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def sync_library(kind, full=False):
+    """
+    Bring the mirror of one library list up to date. Incremental syncs fetch
+    growing pages until they reach an item already mirrored; full syncs
+    replace the list and drop removed items.
+    """
+    id_field = LIBRARY_KINDS[kind][1]
+    takes_limit = LIBRARY_KINDS[kind][2]
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        account = _library_auth_version
+        known = {row[0] for row in conn.execute("SELECT item_id FROM library_items WHERE kind = ?", (kind,))}
+    full = full or not known or not takes_limit
+
+    if full:
+        fetched, envelope = _library_fetch(kind, LIBRARY_FULL_SYNC_LIMIT)
+    else:
+        limit = LIBRARY_SYNC_PAGE
+        while True:
+            fetched, envelope = _library_fetch(kind, limit)
+            reached_known = any(item.get(id_field) in known for item in fetched)
+            if reached_known or len(fetched) < limit or limit >= LIBRARY_FULL_SYNC_LIMIT:
+                break
+            limit *= 4
+        full = len(fetched) < limit  # A short page is the whole list
+
+    _library_write(kind, fetched, envelope, full, account=account)
+    _LIBRARY_STATS["full_syncs" if full else "syncs"] += 1
+
+def _seed_library(kind, limit):
+    """Mirror the first page of an empty list now and backfill the rest in the background"""
+    if not LIBRARY_KINDS[kind][2]:
+        sync_library(kind)  # No limit to ask for, the whole list comes back anyway
+        return
+    with _LIBRARY_LOCK:
+        _library_db()
+        account = _library_auth_version
+    fetched, envelope = _library_fetch(kind, int(limit or LIBRARY_SYNC_PAGE))
+    _library_write(kind, fetched, envelope, full=False, seed=True, account=account)
+    _LIBRARY_STATS["syncs"] += 1
+    _schedule_sync(kind, True)
+
+def _background_sync(kind, full):
+    try:
+        sync_library(kind, full)
+    except Exception:
+        _LIBRARY_STATS["sync_errors"] += 1
+    finally:
+        with _LIBRARY_LOCK:
+            _LIBRARY_SYNCING.discard(kind)
+            resync = _LIBRARY_RESYNC.pop(kind, None)
+        if resync is not None:
+            _schedule_sync(kind, resync)
+
+def _schedule_sync(kind, full, resync=False):
+    """Queue a background sync; with resync, one already running is followed by another"""
+    with _LIBRARY_LOCK:
+        if kind in _LIBRARY_SYNCING:
+            if resync:
+                _LIBRARY_RESYNC[kind] = full or _LIBRARY_RESYNC.get(kind, False)
+            return
+        _LIBRARY_SYNCING.add(kind)
+    _LIBRARY_EXECUTOR.submit(run_in_lane, "background", _background_sync, kind, full)
+
+def _library_changed(kind, removed=(), full=False):
+    """
+    A mutation succeeded upstream: drop removed ids from the mirror now and
+    resync the list in the background. Lists never mirrored are left alone.
+    """
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        if conn is None or conn.execute("SELECT 1 FROM library_sync WHERE kind = ?", (kind,)).fetchone() is None:
+            return
+        if removed:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "DELETE FROM library_items WHERE kind = ? AND item_id = ?",
+                    [(kind, item_id) for item_id in removed]
+                )
+                _reindex_library(conn, kind)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    _schedule_sync(kind, full, resync=True)
+
+def _library_state(kind):
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        if conn is None:
+            return None
+        return conn.execute(
+            "SELECT synced_at, full_synced_at, envelope FROM library_sync WHERE kind = ?", (kind,)
+        ).fetchone()
+
+def read_library(kind, limit=None):
+    """
+    Mirrored items for kind, newest first, answered locally. A stale mirror is
+    refreshed in the background; an empty one fetches the requested page
+    before returning and backfills the rest in the background.
+    Returns (items, envelope), or raises if there is no mirror and sync fails.
+    """
+    state = _library_state(kind)
+    if state is None:
+        if _library_db() is None:
+            raise RuntimeError("Library mirror unavailable")
+        _seed_library(kind, limit)
+        state = _library_state(kind)
+    else:
+        now = time.time()
+        full = now - state[1] > LIBRARY_FULL_SYNC_INTERVAL
+        if full or now - state[0] > LIBRARY_REFRESH_INTERVAL:
+            _schedule_sync(kind, full)
+        _LIBRARY_STATS["local_reads"] += 1
+
+    query = "SELECT payload FROM library_items WHERE kind = ? ORDER BY position"
+    params = (kind,)
+    if limit:
+        query += " LIMIT ?"
+        params = (kind, int(limit))
+    with _LIBRARY_LOCK:
+        rows = _library_db().execute(query, params).fetchall()
+    envelope = json.loads(state[2]) if state and state[2] else None
+    return [json.loads(row[0]) for row in rows], envelope
+
+def _library_response(kind, limit=None):
+    try:
+        items, envelope = read_library(kind, limit)
+    except Exception as e:
+        return json_response({"error": str(e), "type": e.__class__.__name__})
+    if envelope is not None:
+        return json_response(dict(envelope, tracks=items))
+    return json_response(items)
+
+def get_library_sync_state():
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        rows = conn.execute(
+            "SELECT kind, COUNT(*) FROM library_items GROUP BY kind"
+        ).fetchall() if conn is not None else []
+    return dict(_LIBRARY_STATS, items={kind: count for kind, count in rows}, syncing=sorted(_LIBRARY_SYNCING))
+
+# ─────────────────────────────────────────────
+# 🔎 Local Search Index
+# ─────────────────────────────────────────────
+
+LOCAL_SEARCH_LIMIT = 20
+
+# Mirror kind -> resultType used by search_music results
+LOCAL_RESULT_TYPES = {"songs": "song", "liked": "song", "history": "song", "playlists": "playlist", "albums": "album"}
+
+_fts_available = None
+_offline = False
+
+def _fts_enabled(conn):
+    """Create the FTS5 index once; False when SQLite was built without FTS5"""
+    global _fts_available
+    if _fts_available is None:
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(
+                    item_id UNINDEXED, kind UNINDEXED, title, artist, album,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            if conn.execute("SELECT COUNT(*) FROM library_fts").fetchone()[0] == 0:
+                # Index a mirror that predates the FTS table
+                conn.execute("INSERT INTO library_fts SELECT item_id, kind, title, artist, album FROM library_items")
+            _fts_available = True
+        except sqlite3.OperationalError:
+            _fts_available = False
+    return _fts_available
+
+def _reindex_library(conn, kind):
+    # Called inside _library_write's transaction
+    if _fts_enabled(conn):
+        conn.execute("DELETE FROM library_fts WHERE kind = ?", (kind,))
+        conn.execute(
+            "INSERT INTO library_fts SELECT item_id, kind, title, artist, album FROM library_items WHERE kind = ?",
+            (kind,)
+        )
+
+_WORD_CHAR = re.compile(r"\w")
+
+def search_local_items(query, limit=LOCAL_SEARCH_LIMIT):
+    """Ranked library/history matches for query, one entry per item"""
+    tokens = [token.replace('"', '') for token in str(query).split()]
+    tokens = [token for token in tokens if _WORD_CHAR.search(token)]  # FTS never matches "&" or "-"
+    if not tokens:
+        return []
+
+    with _LIBRARY_LOCK:
+        conn = _library_db()
+        if conn is None:
+            return []
+        if _fts_enabled(conn):
+            match = " AND ".join(f'"{token}"*' for token in tokens)
+            rows = conn.execute("""
+                SELECT i.kind, i.item_id, i.payload
+                FROM library_fts f JOIN library_items i ON i.kind = f.kind AND i.item_id = f.item_id
+                WHERE library_fts MATCH ?
+                ORDER BY bm25(library_fts, 0, 0, 10.0, 5.0, 2.0)
+                LIMIT ?
+            """, (match, limit * 3)).fetchall()
+        else:
+            where = " AND ".join("(title || ' ' || COALESCE(artist, '') || ' ' || COALESCE(album, '')) LIKE ?" for _ in tokens)
+            rows = conn.execute(
+                f"SELECT kind, item_id, payload FROM library_items WHERE {where} ORDER BY position LIMIT ?",
+                (*[f"%{token}%" for token in tokens], limit * 3)
+            ).fetchall()
+
+    results, seen = [], set()
+    for kind, item_id, payload in rows:
+        if item_id in seen:
+            continue  # Same track can be in liked songs, library and history
+        seen.add(item_id)
+        item = json.loads(payload)
+        item.setdefault("resultType", LOCAL_RESULT_TYPES[kind])
+        item["local"] = kind
+        results.append(item)
+        if len(results) >= limit:
+            break
+    return results
+
+def search_local(query, limit=LOCAL_SEARCH_LIMIT):
+    return json_response(search_local_items(query, limit))
+
+def set_offline(offline):
+    """Network state from the app; while offline, search is answered from the local index"""
+    global _offline
+    if bool(offline) != _offline:
+        clear_dns_cache()  # Addresses resolved on the previous network may not be reachable
+    _offline = bool(offline)
+    return json_response({"offline": _offline})
 
 # ─────────────────────────────────────────────
 # ⭐ Library Actions
 # ─────────────────────────────────────────────
 
 def get_library_playlists():
-    return json_response(safe_api_call(get_ytmusic().get_library_playlists))
+    return _library_response("playlists")
 
 def get_library_albums():
-    return json_response(safe_api_call(get_ytmusic().get_library_albums))
+    return _library_response("albums")
 
 def get_library_songs(limit=30):
-    return json_response(safe_api_call(get_ytmusic().get_library_songs, limit))
+    return _library_response("songs", limit)
 
 def get_library_artists():
     return json_response(safe_api_call(get_ytmusic().get_library_artists))
@@ -356,22 +2754,322 @@ def get_library_subscriptions():
     return json_response(safe_api_call(get_ytmusic().get_library_subscriptions))
 
 def get_liked_songs(limit=50):
-    return json_response(safe_api_call(get_ytmusic().get_liked_songs, limit))
+    return _library_response("liked", limit)
 
 def edit_song_library_status(feedbackToken):
-    return json_response(safe_api_call(get_ytmusic().edit_song_library_status, feedbackToken))
+    result = safe_api_call(get_ytmusic().edit_song_library_status, feedbackToken)
+    if not _is_error_result(result):
+        _library_changed("songs", full=True)  # The token doesn't say which song, or where it sat
+    return json_response(result)
 
 def get_history():
-    return json_response(safe_api_call(get_ytmusic().get_history))
+    return _library_response("history")
 
 def add_history(videoId):
     try:
         data = safe_api_call(get_ytmusic().get_song, videoId)
-        safe_api_call(get_ytmusic().add_history_item, data)
+        if not _is_error_result(safe_api_call(get_ytmusic().add_history_item, data)):
+            _library_changed("history")
         return json_response({"status": "ok", "videoId": videoId})
     except Exception as e:
         return json_response({"status": "error", "message": str(e)})
 
+# ─────────────────────────────────────────────
+# 📝 Lyrics Store
+# ─────────────────────────────────────────────
+
+LYRICS_DB = "lyrics.db"
+LYRICS_TTL = 30 * 24 * 3600
+LRC_LAST_LINE_MS = 5000  # Display time given to the final LRC line
+
+_LRC_LINE = re.compile(r"\[(\d+):(\d{2})(?:[.:](\d{1,3}))?\](.*)")
+_LYRICS_LOCK = threading.Lock()
+_LYRICS_STATS = {"hits": 0, "misses": 0, "prefetched": 0}
+_lyrics_ready = False
+
+def _lyrics_db():
+    global _lyrics_ready
+    conn = _open_sqlite(LYRICS_DB)
+    if conn is not None and not _lyrics_ready:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS lyrics (
+                browse_id TEXT NOT NULL,
+                timestamped INTEGER NOT NULL,
+                video_id TEXT,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (browse_id, timestamped)
+            );
+            CREATE INDEX IF NOT EXISTS lyrics_video ON lyrics (video_id);
+        """)
+        _lyrics_ready = True
+    return conn
+
+def parse_lrc(lrc):
+    """LRC text -> [[start_ms, end_ms, text], ...] sorted by start"""
+    lines = []
+    for raw in lrc.splitlines():
+        match = _LRC_LINE.match(raw.strip())
+        if not match:
+            continue
+        minutes, seconds, fraction, text = match.groups()
+        fraction = (fraction or "0").ljust(3, "0")
+        start = (int(minutes) * 60 + int(seconds)) * 1000 + int(fraction)
+        if text.strip():
+            lines.append([start, 0, text.strip()])
+    lines.sort(key=lambda line: line[0])
+    for current, following in zip(lines, lines[1:]):
+        current[1] = following[0]
+    if lines:
+        lines[-1][1] = lines[-1][0] + LRC_LAST_LINE_MS
+    return lines
+
+def normalize_lyrics(result, timestamped):
+    """
+    Compact, JSON-safe lyrics: timed lyrics become [[start_ms, end_ms, text], ...]
+    whether they came as ytmusicapi LyricLine objects or as LRC text
+    """
+    lines = result.get("lyrics")
+    if timestamped and isinstance(lines, list):
+        compact = []
+        for line in lines:
+            if isinstance(line, dict):
+                compact.append([int(line.get("start_time") or 0), int(line.get("end_time") or 0), line.get("text") or ""])
+            else:
+                compact.append([int(line.start_time or 0), int(line.end_time or 0), line.text or ""])
+        return {"lyrics": compact, "source": result.get("source"), "hasTimestamps": True}
+    if timestamped and isinstance(lines, str) and _LRC_LINE.search(lines):
+        return {"lyrics": parse_lrc(lines), "source": result.get("source"), "hasTimestamps": True}
+    return {"lyrics": lines, "source": result.get("source"), "hasTimestamps": False}
+
+def _stored_lyrics(browse_id=None, timestamped=False, video_id=None):
+    column, key = ("browse_id", browse_id) if browse_id else ("video_id", video_id)
+    with _LYRICS_LOCK:
+        conn = _lyrics_db()
+        if conn is None:
+            return None
+        rows = conn.execute(
+            f"SELECT timestamped, payload, fetched_at FROM lyrics WHERE {column} = ? ORDER BY timestamped DESC",
+            (key,)
+        ).fetchall()
+    for row_timestamped, payload, fetched_at in rows:
+        if time.time() - fetched_at > LYRICS_TTL:
+            continue
+        lyrics = json.loads(payload)
+        # An untimed row answers a timed request only if upstream had nothing timed
+        if not lyrics.pop("noTimedLyrics", False) and timestamped and not row_timestamped:
+            continue
+        if not timestamped and row_timestamped:
+            # Plain text can be served from timed lines
+            lyrics = dict(lyrics, lyrics="\n".join(line[2] for line in lyrics["lyrics"]), hasTimestamps=False)
+        return lyrics
+    return None
+
+def _store_lyrics(browse_id, timestamped, video_id, result):
+    if not isinstance(result, dict) or _is_error_result(result):
+        return None
+    lyrics = normalize_lyrics(result, timestamped)
+    stored = lyrics
+    if timestamped and not lyrics["hasTimestamps"]:
+        stored = dict(lyrics, noTimedLyrics=True)
+    with _LYRICS_LOCK:
+        conn = _lyrics_db()
+        if conn is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?)",
+                (browse_id, int(lyrics["hasTimestamps"]), video_id,
+                 json.dumps(stored, separators=(',', ':')), time.time())
+            )
+    return lyrics
+
+def fetch_lyrics(browse_id, timestamped=False, video_id=None):
+    stored = _stored_lyrics(browse_id, timestamped)
+    if stored is not None:
+        _LYRICS_STATS["hits"] += 1
+        return stored
+    _LYRICS_STATS["misses"] += 1
+    result = safe_api_call(get_ytmusic().get_lyrics, browse_id, timestamped)
+    return _store_lyrics(browse_id, timestamped, video_id, result) or result
+
+def fetch_video_lyrics(video_id, timestamped=True):
+    """Lyrics for a video, resolving its lyrics browseId through the watch playlist"""
+    stored = _stored_lyrics(None, timestamped, video_id)
+    if stored is not None:
+        _LYRICS_STATS["hits"] += 1
+        return stored
+    watch_playlist = safe_api_call(get_ytmusic().get_watch_playlist, video_id)
+    if _is_error_result(watch_playlist):
+        return watch_playlist
+    browse_id = (watch_playlist or {}).get("lyrics")
+    if not browse_id:
+        return {"lyrics": None, "source": None, "hasTimestamps": False}
+    return fetch_lyrics(browse_id, timestamped, video_id)
+
+def prefetch_lyrics(video_id):
+    if _stored_lyrics(None, True, video_id) is None:
+        fetch_video_lyrics(video_id, True)
+        _LYRICS_STATS["prefetched"] += 1
+
+def get_video_lyrics(video_id, timestamp=True):
+    return json_response(fetch_video_lyrics(video_id, timestamp))
+
+# ─────────────────────────────────────────────
+# 🕸️ Entity Graph
+# ─────────────────────────────────────────────
+
+# kind -> ytmusicapi method (also the response cache endpoint)
+ENTITY_KINDS = {"album": "get_album", "artist": "get_artist"}
+ENTITY_FRESH_FOR = 10 * 60  # Seconds a full record is served without touching the response cache
+
+# What to prefetch once a page loads: link role -> how many of them
+ENTITY_PREFETCH = {
+    "artist": {"albums": 3, "singles": 1},
+    "album": {"artists": 1},
+    "song": {"album": 1, "artists": 1},
+}
+
+_ENTITIES = MemoryCache("entities", max_entries=512)
+_ENTITY_LOCK = threading.Lock()
+_ENTITY_PENDING = set()
+_ENTITY_STATS = {"hits": 0, "fetches": 0, "prefetched": 0, "prefetch_failed": 0}
+
+def _entity_kind(browse_id):
+    if browse_id.startswith("UC"):
+        return "artist"
+    if browse_id.startswith("MPRE"):
+        return "album"
+    return None
+
+def _section_results(section):
+    if isinstance(section, dict):
+        return section.get("results") or []
+    return section if isinstance(section, list) else []
+
+def _entity_summary(item):
+    return {"name": item.get("title") or item.get("name") or item.get("artist"), "thumbnails": item.get("thumbnails")}
+
+def _entity_links(kind, data):
+    """(kind, id, role, summary) for every album/artist a page links to, in page order"""
+    links = []
+
+    def add(link_kind, item, id_key, role):
+        entity_id = item.get(id_key) if isinstance(item, dict) else None
+        if isinstance(entity_id, str) and entity_id:
+            links.append((link_kind, entity_id, role, _entity_summary(item)))
+
+    if kind == "artist":
+        for role in ("albums", "singles"):
+            for item in _section_results(data.get(role)):
+                add("album", item, "browseId", role)
+        for item in _section_results(data.get("related")):
+            add("artist", item, "browseId", "related")
+    elif kind == "album":
+        for item in data.get("artists") or []:
+            add("artist", item, "id", "artists")
+        for item in data.get("other_versions") or []:
+            add("album", item, "browseId", "other_versions")
+    elif kind == "song":
+        add("album", data.get("album") or {}, "id", "album")
+        for item in data.get("artists") or []:
+            add("artist", item, "id", "artists")
+    return links
+
+def normalize_artist(artist):
+    """Drop song and video entries that cannot be played"""
+    for section in ("songs", "videos"):
+        value = artist.get(section)
+        if isinstance(value, dict) and isinstance(value.get("results"), list):
+            value["results"] = [item for item in value["results"] if item.get("videoId")]
+        elif isinstance(value, list):
+            artist[section] = [item for item in value if item.get("videoId")]
+    return artist
+
+def _remember_links(links):
+    """Record linked entities as summary-only records (merged, never replacing full ones)"""
+    for link_kind, entity_id, _, summary in links:
+        with _ENTITY_LOCK:
+            record = _ENTITIES.get(entity_id)
+            if record is None:
+                _ENTITIES.put(entity_id, {
+                    "kind": link_kind, "id": entity_id, "summary": summary,
+                    "data": None, "links": [], "fetched_at": None
+                })
+            elif record["data"] is None:
+                for key, value in summary.items():
+                    if value and not record["summary"].get(key):
+                        record["summary"][key] = value
+
+def entity(kind, entity_id, prefetch=True):
+    """Full album/artist data from the graph, fetching (through the response cache) when stale"""
+    record = _ENTITIES.get(entity_id)
+    if record is not None and record["data"] is not None and time.time() - record["fetched_at"] < ENTITY_FRESH_FOR:
+        _ENTITY_STATS["hits"] += 1
+    else:
+        started = time.time()
+        method = ENTITY_KINDS[kind]
+        data = cached_api_call(method, getattr(get_ytmusic(), method), entity_id)
+        if _is_error_result(data) or not isinstance(data, dict):
+            return data
+        if kind == "artist":
+            data = normalize_artist(data)
+        links = _entity_links(kind, data)
+        _remember_links(links)
+        record = {
+            "kind": kind,
+            "id": entity_id,
+            "summary": _entity_summary(data),
+            "data": data,
+            "links": [link[:3] for link in links],
+            "fetched_at": time.time()
+        }
+        _ENTITIES.put(entity_id, record, cost=time.time() - started)
+        _ENTITY_STATS["fetches"] += 1
+    if prefetch:
+        prefetch_links(ENTITY_PREFETCH[kind], record["links"])
+    return record["data"]
+
+def prefetch_links(plan, links):
+    """Queue background fetches for the first few links of each role in plan"""
+    taken = {}
+    for link_kind, entity_id, role in (link[:3] for link in links):
+        if taken.get(role, 0) < plan.get(role, 0):
+            taken[role] = taken.get(role, 0) + 1
+            _schedule_entity_prefetch(link_kind, entity_id)
+
+def _schedule_entity_prefetch(kind, entity_id):
+    if _offline:
+        return
+    record = _ENTITIES.get(entity_id)
+    if record is not None and record["data"] is not None:
+        return
+    with _ENTITY_LOCK:
+        if entity_id in _ENTITY_PENDING:
+            return
+        _ENTITY_PENDING.add(entity_id)
+    # Background lane of the bridge scheduler: cancellable, never ahead of playback
+    future = _BRIDGE_EXECUTOR.submit_to("background", _prefetch_entity, kind, entity_id)
+    future.add_done_callback(lambda f: _ENTITY_PENDING.discard(entity_id))
+
+def _prefetch_entity(kind, entity_id):
+    data = entity(kind, entity_id, prefetch=False)
+    _ENTITY_STATS["prefetch_failed" if _is_error_result(data) else "prefetched"] += 1
+
+def get_entity(entity_id):
+    """What the graph knows about an id without fetching: a summary, and full data if loaded"""
+    record = _ENTITIES.get(entity_id)
+    if record is None:
+        return json_response({"error": f"Unknown entity: {entity_id}"})
+    return json_response({
+        "id": entity_id,
+        "kind": record["kind"],
+        "summary": record["summary"],
+        "complete": record["data"] is not None,
+        "links": [{"kind": kind, "id": link_id, "role": role} for kind, link_id, role in record["links"]]
+    })
+
+def get_entity_stats():
+    return dict(_ENTITY_STATS, pending=len(_ENTITY_PENDING), records=len(_ENTITIES))
+
 # ─────────────────────────────────────────────
 # 🎤 Artist & Album Functions
 # ─────────────────────────────────────────────
@@ -379,29 +3077,29 @@ def get_account_info():
     return json_response(safe_api_call(get_ytmusic().get_account_info))
 
 def get_artist(artist_id):
-    artist_details = safe_api_call(get_ytmusic().get_artist, artist_id)
-    if artist_details and not isinstance(artist_details, dict):
-        artist_details["videos"] = [v for v in artist_details.get("videos", []) 
-                                   if "videoId" in v and v["videoId"]]
-    return json_response(artist_details)
+    return json_response(entity("artist", artist_id))
 
 def get_lyrics(browseId, timestamp=False):
-    return json_response(safe_api_call(get_ytmusic().get_lyrics, browseId, timestamp))
+    return json_response(fetch_lyrics(browseId, timestamp))
 
 # ─────────────────────────────────────────────
 # ⚙️ System Functions
 # ─────────────────────────────────────────────
 def clear_caches():
     """Clear all caches to free memory"""
-    get_song.cache_clear()
-    get_album.cache_clear()
-    if _yt_dlp is not None:
-        _yt_dlp.YoutubeDL.cleanup()
+    for cache in list(_MEMORY_CACHES.values()):
+        cache.clear()
 
 def get_memory_usage():
-    """Get current memory usage in KB"""
-    import resource
-    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    """Get current resident memory usage in KB"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best we can do without procfs
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
 # ─────────────────────────────────────────────
 # ⭐ Rating & Subscription Functions
 # ─────────────────────────────────────────────
@@ -409,6 +3107,8 @@ def get_memory_usage():
 def rate_song(video_id, rating="LIKE"):
     try:
         result = safe_api_call(get_ytmusic().rate_song, video_id, rating)
+        if not _is_error_result(result):
+            _library_changed("liked", removed=[] if rating == "LIKE" else [video_id])
 
         # Check if result is a tuple, convert to list or handle accordingly
         if isinstance(result, tuple):
@@ -437,12 +3137,10 @@ def rate_song(video_id, rating="LIKE"):
         })
 
 def subscribe_artist(channel_id):
-    """Optimized artist subscription with thread pooling"""
-    def _subscribe():
-        return get_ytmusic().subscribe_artists(channel_id)
-    
-    future = _EXECUTOR.submit(_subscribe)
-    return json_response(future.result())
+    """Optimized artist subscription"""
+    return json_response(
+        safe_api_call(get_ytmusic().subscribe_artists, channel_id)
+    )
 
 def unsubscribe_artist(channel_id):
     """Optimized artist unsubscription"""
@@ -454,46 +3152,89 @@ def unsubscribe_artist(channel_id):
 # 🔄 Batch Operations
 # ─────────────────────────────────────────────
 
+BATCH_WORKERS = 3
+BATCH_ADD_INITIAL_CHUNK = 25
+BATCH_ADD_MIN_CHUNK = 5
+BATCH_ADD_MAX_CHUNK = 100
+BATCH_ADD_MAX_RETRIES = 4
+BATCH_ADD_BACKOFF = 0.5
+
+_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+
 def batch_get_songs(song_ids):
     """
     Optimized batch fetching of songs with parallel processing
     """
     results = {}
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_to_id = {
-            executor.submit(get_song, song_id): song_id
-            for song_id in song_ids
-        }
-        for future in as_completed(future_to_id):
-            song_id = future_to_id[future]
-            try:
-                results[song_id] = future.result()
-            except Exception as e:
-                results[song_id] = {"error": str(e)}
+    future_to_id = {
+        _BATCH_EXECUTOR.submit(run_in_lane, "background", get_song, song_id): song_id
+        for song_id in song_ids
+    }
+    for future in as_completed(future_to_id):
+        song_id = future_to_id[future]
+        try:
+            results[song_id] = future.result()
+        except Exception as e:
+            results[song_id] = {"error": str(e)}
     return json_response(results)
 
+_RATE_LIMITED = re.compile(r"\b429\b|rate[- ]?limit|too many requests", re.IGNORECASE)
+
+def _is_retryable(result):
+    """Rate limits and timeouts are worth another try; other errors are not"""
+    if not _is_error_result(result):
+        return False
+    return result["type"] == "TimeoutError" or bool(_RATE_LIMITED.search(result["error"]))
+
 def batch_add_to_playlist(playlist_id, video_ids):
     """
-    Process multiple videos in chunks to avoid timeouts
+    Add videos in bulk: each chunk is one add_playlist_items request.
+    Chunks grow while requests succeed and shrink on rate limits, which are
+    retried with jittered exponential backoff. Reports a status per video.
     """
-    CHUNK_SIZE = 5
+    video_ids = [str(video_id) for video_id in video_ids or []]
+    ytmusic = get_ytmusic()
     results = []
-    
-    for i in range(0, len(video_ids), CHUNK_SIZE):
-        chunk = video_ids[i:i + CHUNK_SIZE]
-        result = add_playlist_items(
-            playlist_id,
-            video_id=None,
-            source_playlist=None,
+    chunk_size = BATCH_ADD_INITIAL_CHUNK
+    position = 0
+    attempt = 0
+
+    while position < len(video_ids):
+        chunk = video_ids[position:position + chunk_size]
+        result = safe_api_call(
+            ytmusic.add_playlist_items,
+            playlistId=playlist_id,
+            videoIds=chunk,
             duplicates=False
         )
-        results.append(json.loads(result))
-        
-        # Small delay between chunks
-        time.sleep(0.1)
-    
+
+        if _is_retryable(result) and attempt < BATCH_ADD_MAX_RETRIES:
+            time.sleep(BATCH_ADD_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+            chunk_size = max(chunk_size // 2, BATCH_ADD_MIN_CHUNK)
+            attempt += 1
+            continue
+
+        if isinstance(result, dict) and result.get("status") == "STATUS_SUCCEEDED":
+            added = {item.get("videoId") for item in result.get("playlistEditResults") or []}
+            results.extend(
+                {"videoId": video_id, "status": "added" if video_id in added else "skipped"}
+                for video_id in chunk
+            )
+            chunk_size = min(chunk_size * 2, BATCH_ADD_MAX_CHUNK)
+        else:
+            error = result.get("error") if isinstance(result, dict) else None
+            results.extend(
+                {"videoId": video_id, "status": "failed", "error": error or str(result)}
+                for video_id in chunk
+            )
+        position += len(chunk)
+        attempt = 0
+
+    invalidate_response("get_playlist", playlist_id)
     return json_response({
         "status": "completed",
+        "added": sum(1 for item in results if item["status"] == "added"),
+        "failed": sum(1 for item in results if item["status"] == "failed"),
         "results": results
     })
 
@@ -504,8 +3245,24 @@ def batch_add_to_playlist(playlist_id, video_ids):
 def get_cache_stats():
     """Returns cache utilization statistics"""
     return json_response({
-        "song_cache": get_song.cache_info(),
-        "album_cache": get_album.cache_info(),
+        "memory_caches": {name: cache.info() for name, cache in _MEMORY_CACHES.items()},
+        "memory_cache_bytes": _MEMORY_STATE["bytes"],
+        "memory_cache_budget": MEMORY_CACHE_BUDGET,
+        "memory_trims": _MEMORY_STATE["trims"],
+        "stream_cache": _STREAM_CACHE_STATS,
+        "prefetch": dict(_PREFETCH_STATS, pending=len(_PREFETCH_FUTURES)),
+        "response_cache": get_response_cache_info(),
+        "suggestions": _SUGGESTION_STATS,
+        "single_flight": dict(_SINGLE_FLIGHT_STATS, inflight=len(_INFLIGHT)),
+        "ytdl_pool": dict(_YDL_POOL_STATS, idle=len(_YDL_POOL), size=YDL_POOL_SIZE),
+        "connections": get_connection_stats(),
+        "auth": get_auth_stats(),
+        "library": get_library_sync_state(),
+        "feeds": get_feed_stats(),
+        "entities": get_entity_stats(),
+        "policies": get_policy_stats(),
+        "scheduler": get_scheduler_stats(),
+        "lyrics": _LYRICS_STATS,
         "memory_usage_kb": get_memory_usage()
     })
 
@@ -514,6 +3271,9 @@ def reset_connection():
     global _yt_dlp, _YTMusic, _ytmusic_instance
     
     clear_caches()
+    clear_stream_cache()
+    invalidate_ytdl_pool()
+    close_http_session()
     _yt_dlp = None
     _ytmusic_instance = None
     
@@ -548,9 +3308,10 @@ def update_ydl_options(new_options):
     # Update options
     YDL_OPTIONS.update(new_options)
     
-    # Reset yt-dlp instance to apply changes
+    # Reset yt-dlp instances to apply changes
     global _yt_dlp
     _yt_dlp = None
+    invalidate_ytdl_pool()
     
     return json_response({
         "status": "success",
@@ -567,59 +3328,87 @@ def periodic_cleanup():
     """
     while True:
         time.sleep(300)  # Run every 5 minutes
-        clear_caches()
-        
-        # Reduce cache sizes if memory is high
-        if get_memory_usage() > 50_000:  # 50MB threshold
-            get_song.cache_clear()
-            get_album.cache_clear()
 
-# Start cleanup thread
-threading.Thread(target=periodic_cleanup, daemon=True).start()
+        # Caches stay warm unless the process is actually under memory pressure
+        if get_memory_usage() > MEMORY_RSS_SOFT_LIMIT_KB:
+            trim_memory_caches(MEMORY_CACHE_BUDGET // 2)
+            _MEMORY_STATE["trims"] += 1
+
 
 # ─────────────────────────────────────────────
 # 📦 Module Export Definitions
 # ─────────────────────────────────────────────
 
+# Functions callable through the bridge; each is wrapped by _instrument_exports
+EXPORTED_FUNCTIONS = [
+    "stream_music",
+    "search_music",
+    "search_music_stream",
+    "search_local",
+    "set_offline",
+    "get_home",
+    "get_charts",
+    "get_mood_categories",
+    "get_mood_playlists",
+    "get_feed",
+    "get_playlist",
+    "get_watch_playlist",
+    "get_song",
+    "get_album",
+    "get_artist",
+    "get_entity",
+    "prefetch_queue",
+    "get_song_details",
+    "get_video_lyrics",
+    "get_lyrics",
+    "get_search_suggestions",
+    "create_playlist",
+    "edit_playlist",
+    "delete_playlist",
+    "add_playlist_items",
+    "remove_playlist_items",
+    "get_library_playlists",
+    "get_library_albums",
+    "get_library_songs",
+    "get_library_artists",
+    "get_library_channels",
+    "get_library_subscriptions",
+    "get_liked_songs",
+    "get_history",
+    "add_history",
+    "rate_song",
+    "edit_song_library_status",
+    "subscribe_artist",
+    "unsubscribe_artist",
+    "batch_get_songs",
+    "batch_add_to_playlist",
+    "get_cache_stats",
+    "get_metrics",
+    "set_tracing",
+    "cancel_background_work",
+    "get_startup_profile",
+    "set_response_encoding",
+    "get_account_info",
+    "load_browser_data",
+    "reset_connection",
+    "update_ydl_options",
+    "update_connection_options",
+    "update_call_policies"
+]
+
 def get_module_functions():
     """Returns list of available API functions"""
-    return json_response([
-        "stream_music",
-        "search_music",
-        "get_home",
-        "get_charts",
-        "get_playlist",
-        "get_watch_playlist",
-        "get_song_details",
-        "get_search_suggestions",
-        "create_playlist",
-        "edit_playlist",
-        "delete_playlist",
-        "add_playlist_items",
-        "remove_playlist_items",
-        "get_library_playlists",
-        "get_library_albums",
-        "get_library_songs",
-        "get_library_artists",
-        "get_library_subscriptions",
-        "get_liked_songs",
-        "get_history",
-        "add_history",
-        "rate_song",
-        "subscribe_artist",
-        "unsubscribe_artist",
-        "batch_get_songs",
-        "batch_add_to_playlist",
-        "get_cache_stats",
-        "reset_connection",
-        "update_ydl_options"
-    ])
+    return json_response(EXPORTED_FUNCTIONS)
 
 # ─────────────────────────────────────────────
 # 🏁 Final Initialization
 # ─────────────────────────────────────────────
 
+_instrument_exports()
+
+_STARTUP_PROFILE["module_import_ms"] = round((time.perf_counter() - _IMPORT_STARTED_AT) * 1000, 1)
+
 if __name__ == "__main__":
     # Android doesn't use __main__, but kept for testing
     warmup()
-    print("YouTube Music API initialized")
\ No newline at end of file
+    print("YouTube Music API initialized")
@@ -0,0 +1,439 @@
+"""
+Benchmark index.py endpoints offline against recorded upstream responses.
+
+Every request ytmusicapi (through the shared requests session) and yt-dlp
+(through YoutubeDL.urlopen) make is rewritten to a local stub HTTP server.
+In --record mode the stub forwards to the real hosts and saves what it sees
+to <fixtures>/http.json; otherwise it replays those responses, optionally
+with an artificial round-trip delay.
+
+Each endpoint runs at several concurrency levels with cold caches (cleared
+before every round) and warm caches (primed once), and the results are
+written as JSON so two runs can be compared. A replayed request with no exact
+fixture gets another recorded response for the same path; each result counts
+those fallbacks (and plain misses) so a run served wrong bodies stands out:
+
+    python benchmarks/endpoints.py --record                  # needs network, once
+    python benchmarks/endpoints.py --output before.json
+    python benchmarks/endpoints.py --output after.json --compare before.json
+
+Without recorded fixtures (or with --synthetic) the run replays
+fixtures/synthetic.json instead: parsed ytmusicapi results per method and a
+stream URL template, served by stand-in clients with the same delay. That
+skips HTTP and response parsing but exercises everything index.py layers on
+top, and it is what runs offline straight from a checkout.
+"""
+import argparse
+import base64
+import copy
+import hashlib
+import http.server
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "android", "app", "src", "main", "python"))
+
+import index  # noqa: E402
+import requests  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SYNTHETIC_FIXTURE = "synthetic.json"
+DEFAULT_WORKLOAD = {
+    "queries": ["lofi hip hop", "daft punk", "arijit singh"],
+    "video_ids": ["dQw4w9WgXcQ", "kJQP7kiw5Fk", "fJ9rUzIMcZQ"],
+}
+ENDPOINTS = ("search_music", "get_home", "get_song_details", "stream_music", "batch_get_songs", "json_response")
+
+# Request fields that change between runs without changing the response
+VOLATILE_PARAMS = {"bpctr", "cpn", "rn", "t", "alr", "sig", "n", "prettyPrint"}
+VOLATILE_BODY_KEYS = {"context", "playbackContext", "cpn", "serviceIntegrityDimensions"}
+DROPPED_REQUEST_HEADERS = {"host", "content-length", "accept-encoding", "connection"}
+
+
+def _request_key(method, host, path, query, body):
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    try:
+        data = json.loads(body) if body else None
+        if isinstance(data, dict):
+            data = {k: v for k, v in data.items() if k not in VOLATILE_BODY_KEYS}
+        body = json.dumps(data, sort_keys=True).encode()
+    except ValueError:
+        pass
+    digest = hashlib.sha1(urlencode(params).encode() + b"|" + (body or b"")).hexdigest()[:16]
+    return f"{method} {host}{path} {digest}"
+
+
+class FixtureStore:
+    """Recorded responses keyed by request, with a per-path fallback for near misses"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {"hits": 0, "fallbacks": 0, "misses": 0, "recorded": 0}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            prefix = key.rsplit(" ", 1)[0] + " "
+            entry = next((value for name, value in self.entries.items() if name.startswith(prefix)), None)
+            outcome = "fallbacks" if entry is not None else "misses"
+        else:
+            outcome = "hits"
+        with self.lock:
+            self.stats[outcome] += 1
+        return entry
+
+    def put(self, key, status, content_type, body):
+        try:
+            encoded = {"text": body.decode("utf-8")}
+        except UnicodeDecodeError:
+            encoded = {"base64": base64.b64encode(body).decode()}
+        with self.lock:
+            self.entries[key] = dict(encoded, status=status, content_type=content_type)
+            self.stats["recorded"] += 1
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+def _make_handler(store, record, latency):
+    upstream = requests.Session()
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            host, _, rest = self.path.lstrip("/").partition("/")
+            parts = urlsplit("/" + rest)
+            key = _request_key(self.command, host, parts.path, parts.query, body)
+
+            if record:
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in DROPPED_REQUEST_HEADERS}
+                response = upstream.request(self.command, f"https://{host}/{rest}", data=body or None, headers=headers)
+                entry = {"status": response.status_code, "content_type": response.headers.get("Content-Type", "")}
+                payload = response.content
+                store.put(key, entry["status"], entry["content_type"], payload)
+            else:
+                entry = store.get(key)
+                if entry is None:
+                    entry, payload = {"status": 404, "content_type": "text/plain"}, b"no fixture for " + key.encode()
+                elif "base64" in entry:
+                    payload = base64.b64decode(entry["base64"])
+                else:
+                    payload = entry["text"].encode("utf-8")
+                if latency:
+                    time.sleep(latency)
+
+            self.send_response(entry["status"])
+            self.send_header("Content-Type", entry["content_type"] or "application/octet-stream")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_HEAD = _serve
+
+    return StubHandler
+
+
+class StubServer:
+    def __init__(self, store, record=False, latency_ms=0):
+        handler = _make_handler(store, record, latency_ms / 1000)
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def rewrite(self, url):
+        if url.startswith(self.base):
+            return url
+        parts = urlsplit(url)
+        return f"{self.base}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def route_through(stub):
+    """Send ytmusicapi and yt-dlp traffic to the stub server"""
+    class StubAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = stub.rewrite(request.url)
+            return super().send(request, **kwargs)
+
+    session = index.get_http_session()
+    session.mount("https://", StubAdapter())
+    session.mount("http://", StubAdapter())
+
+    import yt_dlp
+    original_urlopen = yt_dlp.YoutubeDL.urlopen
+
+    def urlopen(self, req):
+        if isinstance(req, str):
+            req = stub.rewrite(req)
+        elif hasattr(req, "full_url"):
+            req.full_url = stub.rewrite(req.full_url)
+        else:
+            req.url = stub.rewrite(req.url)
+        return original_urlopen(self, req)
+
+    yt_dlp.YoutubeDL.urlopen = urlopen
+
+
+class SyntheticClient:
+    """YTMusic stand-in answering each method with its synthetic fixture"""
+
+    def __init__(self, responses, latency):
+        self.responses = responses
+        self.latency = latency
+        self.stats = {"hits": 0, "fallbacks": 0, "misses": 0, "recorded": 0}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name not in self.responses:
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            with self.lock:
+                self.stats["hits"] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            return copy.deepcopy(self.responses[name])
+
+        method.__name__ = name
+        return method
+
+
+class SyntheticYoutubeDL:
+    """YoutubeDL stand-in returning a stream URL built from the fixture template"""
+
+    def __init__(self, url_template, latency):
+        self.url_template = url_template
+        self.latency = latency
+
+    def extract_info(self, url, download=False, process=False):
+        if self.latency:
+            time.sleep(self.latency)
+        video_id = url.rsplit("v=", 1)[-1]
+        return {"url": self.url_template.format(video_id=video_id, expire=int(time.time()) + 21600)}
+
+    def close(self):
+        pass
+
+
+def route_synthetic(fixture, latency):
+    """Serve index.py's upstream calls from a synthetic fixture; returns the client (for stats)"""
+    client = SyntheticClient(fixture["ytmusic"], latency)
+    index.get_ytmusic = lambda: client
+    index.get_ytdl = lambda: SyntheticYoutubeDL(fixture["stream_url"], latency)
+    return client
+
+
+def reset_caches():
+    """Drop every cache an endpoint could be served from"""
+    index.clear_caches()
+    index.clear_stream_cache()
+    index.clear_response_cache()
+    index.clear_feeds()
+    with index._LYRICS_LOCK:
+        conn = index._lyrics_db()
+        if conn is not None:
+            conn.execute("DELETE FROM lyrics")
+
+
+def scenarios(workload, payload=None):
+    """endpoint -> (callable taking one workload item, items per round)"""
+    queries, video_ids = workload["queries"], workload["video_ids"]
+    return {
+        "search_music": (index.search_music, queries),
+        "get_home": (lambda _: index.get_home(), [None]),
+        "get_song_details": (index.get_song_details, video_ids),
+        "stream_music": (index.stream_music, video_ids),
+        "batch_get_songs": (index.batch_get_songs, [video_ids]),
+        "json_response": (lambda _: index.json_response(payload), [None]),
+    }
+
+
+def _is_error(result):
+    return isinstance(result, str) and result.startswith('{"error"')
+
+
+def run_round(func, items, concurrency):
+    """Call func once per item with `concurrency` threads; returns (latencies ms, errors, wall s)"""
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            failed = _is_error(func(item))
+        except Exception:
+            failed = True
+        return (time.perf_counter() - start) * 1000, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, items))
+    return [ms for ms, _ in results], sum(failed for _, failed in results), time.perf_counter() - start
+
+
+def _percentile(samples, fraction):
+    return round(samples[min(int(len(samples) * fraction), len(samples) - 1)], 3)
+
+
+def measure(name, func, items, concurrency, cache, rounds):
+    latencies, errors, wall = [], 0, 0.0
+    if cache == "warm":
+        run_round(func, items, 1)
+    for _ in range(rounds):
+        if cache == "cold":
+            reset_caches()
+        # Repeat the workload so every thread has work at this concurrency
+        round_items = (items * concurrency)[:max(len(items), concurrency)]
+        samples, failed, elapsed = run_round(func, round_items, concurrency)
+        latencies += samples
+        errors += failed
+        wall += elapsed
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "cache": cache,
+        "concurrency": concurrency,
+        "ops": len(latencies),
+        "errors": errors,
+        "throughput_ops_s": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print runs whose p95 regressed by more than tolerance; returns their count"""
+    with open(baseline_path) as f:
+        baseline = {(r["endpoint"], r["cache"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        before = baseline.get((result["endpoint"], result["cache"], result["concurrency"]))
+        if before and before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions += 1
+            print(f"regression: {result['endpoint']} {result['cache']} x{result['concurrency']} "
+                  f"p95 {before['p95_ms']}ms -> {result['p95_ms']}ms", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory holding http.json and workload.json")
+    parser.add_argument("--record", action="store_true", help="Forward to the real hosts and save the responses")
+    parser.add_argument("--synthetic", action="store_true", help=f"Replay {SYNTHETIC_FIXTURE} even if HTTP fixtures exist")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--cache", nargs="+", choices=("cold", "warm"), default=["cold", "warm"])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=40, help="Delay added to each replayed response")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier results file; exit 1 if any p95 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95 growth for --compare")
+    args = parser.parse_args()
+
+    workload_path = os.path.join(args.fixtures, "workload.json")
+    store = FixtureStore(os.path.join(args.fixtures, "http.json"))
+    synthetic = not args.record and (args.synthetic or not store.entries)
+    if synthetic:
+        synthetic_path = os.path.join(args.fixtures, SYNTHETIC_FIXTURE)
+        if not os.path.exists(synthetic_path):
+            synthetic_path = os.path.join(DEFAULT_FIXTURES, SYNTHETIC_FIXTURE)
+        with open(synthetic_path) as f:
+            synthetic_fixture = json.load(f)
+    workload = DEFAULT_WORKLOAD
+    if os.path.exists(workload_path):
+        with open(workload_path) as f:
+            workload = json.load(f)
+
+    storage = tempfile.mkdtemp(prefix="harmonix-bench-")
+    index.STORAGE_PATH = storage
+    if synthetic:
+        stub = None
+        store = route_synthetic(synthetic_fixture, args.latency_ms / 1000)
+    else:
+        stub = StubServer(store, record=args.record, latency_ms=0 if args.record else args.latency_ms)
+        route_through(stub)
+
+    try:
+        if args.record:
+            for name in args.endpoints:
+                func, items = scenarios(workload)[name]
+                reset_caches()
+                run_round(func, items, 1)
+            store.save()
+            with open(workload_path, "w") as f:
+                json.dump(workload, f, indent=1)
+            # Parsed responses double as fixtures for benchmarks/serialization.py
+            with open(os.path.join(args.fixtures, "get_home.json"), "w") as f:
+                f.write(index.get_home())
+            print(json.dumps(store.stats))
+            return
+
+        results = []
+        # json_response serializes a parsed home feed, fetched once outside the timings
+        payload = json.loads(index.get_home()) if "json_response" in args.endpoints else None
+        table = scenarios(workload, payload)
+        for name in args.endpoints:
+            func, items = table[name]
+            for cache in args.cache:
+                for concurrency in args.concurrency:
+                    before = dict(store.stats)
+                    result = measure(name, func, items, concurrency, cache, args.rounds)
+                    result.update((k, store.stats[k] - before[k]) for k in ("fallbacks", "misses"))
+                    if result["fallbacks"] or result["misses"]:
+                        print(f"inexact fixtures: {name} {cache} x{concurrency} "
+                              f"{result['fallbacks']} fallbacks, {result['misses']} misses", file=sys.stderr)
+                    results.append(result)
+    finally:
+        if stub is not None:
+            stub.close()
+        shutil.rmtree(storage, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "orjson": index._json_encoder() is index._dumps_orjson,
+            "latency_ms": args.latency_ms,
+            "rounds": args.rounds,
+            "fixtures": "synthetic" if synthetic else "recorded",
+            "stub": store.stats,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark json_response: serialization time and payload bytes per endpoint.
+
+Compares the stdlib and orjson backends (when orjson is installed), with and
+without compact mode, and reports the size after threshold compression.
+Payloads are synthetic but shaped like the real responses; pass --fixtures
+with a directory of <endpoint>.json files to use recorded responses instead.
+
+    python benchmarks/serialization.py --iterations 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "android", "app", "src", "main", "python"))
+
+import index  # noqa: E402
+
+ENDPOINTS = ("get_home", "get_playlist", "get_library_songs")
+
+
+def _thumbnails(seed):
+    return [
+        {"url": f"https://lh3.googleusercontent.com/{seed}=w{size}-h{size}", "width": size, "height": size}
+        for size in (60, 120, 226, 544)
+    ]
+
+
+def _track(i):
+    return {
+        "videoId": f"vid{i:08d}",
+        "title": f"Track title number {i}",
+        "artists": [{"name": f"Artist {i % 37}", "id": f"UC{i % 37:022d}"}],
+        "album": {"name": f"Album {i % 91}", "id": f"MPREb_{i % 91:011d}"},
+        "likeStatus": "INDIFFERENT",
+        "thumbnails": _thumbnails(i),
+        "isAvailable": True,
+        "isExplicit": i % 7 == 0,
+        "duration": f"{3 + i % 3}:{i % 60:02d}",
+        "duration_seconds": 180 + i % 120,
+        "setVideoId": f"{i:016X}",
+        "feedbackTokens": {"add": f"AB{i}" * 8, "remove": f"CD{i}" * 8},
+    }
+
+
+def synthetic_payloads():
+    return {
+        "get_home": [
+            {"title": f"Section {s}", "contents": [dict(_track(s * 100 + i), playlistId=f"RDAMVM{i}") for i in range(20)]}
+            for s in range(8)
+        ],
+        "get_playlist": {
+            "id": "PL" + "x" * 32,
+            "title": "Big playlist",
+            "thumbnails": _thumbnails("playlist"),
+            "trackCount": 300,
+            "tracks": [_track(i) for i in range(300)],
+        },
+        "get_library_songs": [_track(i) for i in range(500)],
+    }
+
+
+def load_payloads(fixtures):
+    if not fixtures:
+        return synthetic_payloads()
+    payloads = {}
+    for endpoint in ENDPOINTS:
+        path = os.path.join(fixtures, f"{endpoint}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                payloads[endpoint] = json.load(f)
+    return payloads
+
+
+def _measure(data, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        out = index.json_response(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--fixtures", help="Directory of recorded <endpoint>.json responses")
+    parser.add_argument("--threshold", type=int, default=32 * 1024, help="Compression threshold in bytes")
+    args = parser.parse_args()
+
+    backends = ["json"]
+    index.RESPONSE_ENCODING["backend"] = "orjson"
+    if index._json_encoder() is index._dumps_orjson:
+        backends.append("orjson")
+
+    print(f"{'endpoint':<18} {'backend':<7} {'compact':<7} {'median ms':>9} {'bytes':>9} {'compressed':>10}")
+    for endpoint, data in load_payloads(args.fixtures).items():
+        for backend in backends:
+            for compact in (False, True):
+                index.RESPONSE_ENCODING.update(backend=backend, compact=compact, compress_threshold=None)
+                median, out = _measure(data, args.iterations)
+                index.RESPONSE_ENCODING["compress_threshold"] = args.threshold
+                compressed = index.json_response(data)
+                print(f"{endpoint:<18} {backend:<7} {str(compact):<7} {median:9.3f} {len(out):9d} {len(compressed):10d}")
+
+
+if __name__ == "__main__":
+    main()
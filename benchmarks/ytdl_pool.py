@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: per-call YoutubeDL construction vs. the pooled path.
+
+Run from the repository root with yt-dlp installed:
+
+    python benchmarks/ytdl_pool.py --iterations 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "android", "app", "src", "main", "python"))
+
+import index  # noqa: E402
+
+
+def _time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _per_call():
+    index.get_ytdl()
+
+
+def _pooled():
+    with index.pooled_ytdl():
+        pass
+
+
+def _report(name, samples):
+    samples = sorted(samples)
+    print(f"{name:<10} mean={statistics.mean(samples):8.3f}ms "
+          f"p50={samples[len(samples) // 2]:8.3f}ms "
+          f"p95={samples[int(len(samples) * 0.95) - 1]:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    # Import yt_dlp outside the timed region so both paths pay the same import cost
+    index.get_ytdl()
+    index.invalidate_ytdl_pool()
+
+    _report("per-call", _time_calls(_per_call, args.iterations))
+    _report("pooled", _time_calls(_pooled, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 // useOfflineStatus.ts
 import { useState, useEffect, useRef } from 'react';
 import NetInfo, { NetInfoState } from '@react-native-community/netinfo';
-import { AppState, AppStateStatus } from 'react-native';
+import { AppState, AppStateStatus, NativeModules } from 'react-native';
 
 export const useOfflineStatus = () => {
     const [isOffline, setIsOffline] = useState<boolean>(false);
@@ -12,6 +12,8 @@ export const useOfflineStatus = () => {
     const handleNetworkChange = (state: NetInfoState) => {
         netInfoRef.current = state;
         const offline = !state.isConnected;
+        // Lets the Python layer answer searches from the local index while offline
+        NativeModules.PythonModule?.setOffline(offline).catch(() => {});
         if (isOffline !== offline) {
             console.log(`Network status changed: ${offline ? 'Offline' : 'Online'}`);
             setIsOffline(offline);
@@ -214,6 +214,11 @@ const fetchWatchPlaylist = async (songId: string) => {
         console.log(data)
         playerState.playlistId = data.playlistId
 
+        // Resolve upcoming stream URLs in parallel so the loop below hits the cache
+        PythonModule.prefetchQueue(
+            data.tracks.slice(1).map((t: { videoId: string }) => t.videoId),
+            3
+        ).catch((e: unknown) => console.warn('Prefetch error:', e));
 
         for (let i = 1; i < data.tracks.length; i++) {
             if (!playerState.playlistId || playerState.playlistId !== data.playlistId) return;